@@ -0,0 +1,58 @@
+'''Benchmark of the thread pool backends for batch formatting and unformatting, for a range of
+thread counts. Run on both a standard (GIL) and a free-threaded (no GIL) Python build to
+compare how they scale:
+
+    python scripts/bench_threads.py --lines 200000 --threads 1 2 4 8
+'''
+
+import argparse
+import sys
+import time
+from parmatter import FormatGroup
+from parmatter.parallel import format_parallel, iunformat_parallel
+
+
+def gil_enabled():
+    try:
+        return sys._is_gil_enabled()
+    except AttributeError:
+        return True
+
+
+def best_time(func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--lines', type=int, default=200000)
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--shard-size', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    NodeLine = FormatGroup('NodeLine', Num = '{: >8d}', X = ('{: >12.4f}', 0), Y = ('{: >12.4f}', 0), Z = ('{: >12.4f}', 0))
+    line_rules = {None:(NodeLine,), NodeLine:(NodeLine,)}
+    records = [(i, i/3, i/7, -i/11) for i in range(args.lines)]
+    lines = format_parallel(NodeLine, records, workers=1).splitlines()
+
+    print('Python {} ({})'.format(sys.version.split()[0], 'GIL' if gil_enabled() else 'free-threaded'))
+    print('{:>8} {:>12} {:>9} {:>12} {:>9}'.format('threads', 'format s', 'speedup', 'unformat s', 'speedup'))
+    base = None
+    for threads in args.threads:
+        format_time = best_time(lambda: format_parallel(NodeLine, records, workers=threads,
+                                                        shard_size=args.shard_size, backend='thread'), args.repeat)
+        unformat_time = best_time(lambda: list(iunformat_parallel(lines, line_rules, workers=threads,
+                                                                  shard_size=args.shard_size)), args.repeat)
+        base = base or (format_time, unformat_time)
+        print('{:>8d} {:>12.3f} {:>8.2f}x {:>12.3f} {:>8.2f}x'.format(threads, format_time, base[0]/format_time,
+                                                                    unformat_time, base[1]/unformat_time))
+
+
+if __name__ == '__main__':
+    main()
@@ -28,6 +28,7 @@ setup(
  	package_dir={'':'src'},
     packages=find_packages(where='src', exclude=['*.tests', '*.tests.*', 'tests.*', 'tests']),
     scripts=['scripts/test_script.bat'],
+    entry_points={'console_scripts': ['parmatter=parmatter.cli:main']},
     install_requires=['parse'],
     include_package_data=True,
     long_description='{:s}\n\n{:s}'.format(_read('README.rst'), _read('CHANGELOG.rst')),
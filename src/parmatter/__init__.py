@@ -1,4 +1,5 @@
 from .parmatter import Formatter, Parmatter
 from .parmatters import StaticParmatter, FloatIntParmatter, BlankParmatter, DefaultParmatter, AttrParmatter, PositionalDefaultParmatter, KeywordParmatter, VersatileParmatter
 from .group import FormatGroup, FormatGroupMeta
-from .unformat_file import unformat_lines
+from .unformat_file import unformat_lines, unformat_columns, unformat_path
+from .format_file import format_lines, format_path
@@ -0,0 +1,133 @@
+'''Asyncio API for unformatting and formatting many files concurrently without stalling the
+event loop. File reads, writes and parsing are run in a bounded thread pool, and the number of
+files open at once is limited by a semaphore; both limits are set using AsyncLimits.
+
+Usage:
+
+    >>> limits = AsyncLimits(max_workers=4, max_open_files=32)
+    >>> async for LineType, result in aiter_unformat_path('model.dat', line_rules, limits=limits):
+    ...     ...
+    >>> results = await unformat_many(paths, line_rules, limits=limits)
+    >>> await format_many(NodeLine, records, 'nodes.txt.gz', limits=limits)
+'''
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from itertools import islice
+import os
+import threading
+import weakref
+from .parallel import shards, format_shard
+from .streams import open_lines
+from .unformat_file import iunformat_lines, unformat_path
+
+
+class AsyncLimits():
+    '''Concurrency limits shared by the async functions: the number of worker threads used for
+    reading, parsing and writing, and the number of files open at once in each event loop.
+    The limits can be reused by successive event loops (e.g. several asyncio.run calls).'''
+    def __init__(self, max_workers=None, max_open_files=64):
+        self.max_workers = max_workers
+        self.max_open_files = max_open_files
+        self.executor = ThreadPoolExecutor(max_workers, thread_name_prefix='parmatter')
+        # semaphores bind to the event loop that first waits on them; one per loop
+        self._open_files = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+    @property
+    def open_files(self):
+        '''The semaphore limiting the number of open files, for the running event loop.'''
+        loop = asyncio.get_running_loop()
+        try:
+            return self._open_files[loop]
+        except KeyError:
+            with self._lock:
+                return self._open_files.setdefault(loop, asyncio.Semaphore(self.max_open_files))
+    async def run(self, func, *args):
+        '''Run a blocking function in the executor.'''
+        return await asyncio.get_running_loop().run_in_executor(self.executor, partial(func, *args))
+    def shutdown(self, wait=True):
+        self.executor.shutdown(wait)
+
+
+# used when no limits are provided
+_default_limits = None
+
+def default_limits():
+    '''The process-wide AsyncLimits (created on first use with the default limits).'''
+    global _default_limits
+    if _default_limits is None:
+        _default_limits = AsyncLimits()
+    return _default_limits
+
+
+async def aiter_unformat_path(path, line_rules, chunk_lines=10000, limits=None, encoding=None):
+    '''Asynchronously generates (LineType, LineType.unformat result) pairs for a plain or
+    compressed file. Chunks of chunk_lines lines are read and unformatted in the executor.'''
+    limits = limits or default_limits()
+    async with limits.open_files:
+        f = await limits.run(open_lines, path, 'r', encoding)
+        try:
+            # parse patterns must match the line exactly, so line endings are removed
+            items = iunformat_lines((line.rstrip('\n') for line in f), line_rules)
+            while True:
+                chunk = await limits.run(lambda: list(islice(items, chunk_lines)))
+                if not chunk:
+                    return
+                for item in chunk:
+                    yield item
+        finally:
+            await limits.run(f.close)
+
+
+async def unformat_path_async(path, line_rules, limits=None, **kwargs):
+    '''unformat_path run in the executor; keyword arguments are passed to unformat_path.'''
+    limits = limits or default_limits()
+    async with limits.open_files:
+        return await limits.run(partial(unformat_path, path, line_rules, **kwargs))
+
+
+async def unformat_many(paths, line_rules, limits=None, **kwargs):
+    '''Unformat many files concurrently (see unformat_path_async). Returns the results in
+    the order of the paths.'''
+    limits = limits or default_limits()
+    return await asyncio.gather(*(unformat_path_async(path, line_rules, limits, **kwargs) for path in paths))
+
+
+async def _ashards(records, shard_size):
+    '''Shards of an async iterable of records.'''
+    shard = []
+    async for record in records:
+        shard.append(record)
+        if len(shard) >= shard_size:
+            yield shard
+            shard = []
+    if shard:
+        yield shard
+
+
+async def format_many(cls, records, file, limits=None, shard_size=10000):
+    '''Format records (an iterable or async iterable) with a format group and write the lines
+    to a file object or path (compressed according to the suffix; see format_path). The
+    records are formatted and written in shards of shard_size in the executor.'''
+    limits = limits or default_limits()
+    if hasattr(records, '__aiter__'):
+        record_shards = _ashards(records, shard_size)
+    else:
+        async def record_shards():
+            for shard in shards(records, shard_size):
+                yield shard
+        record_shards = record_shards()
+    async def write(f):
+        async for shard in record_shards:
+            text = await limits.run(format_shard, cls, shard)
+            await limits.run(f.write, text)
+    if isinstance(file, (str, os.PathLike)):
+        async with limits.open_files:
+            f = await limits.run(open_lines, file, 'w')
+            try:
+                await write(f)
+            finally:
+                await limits.run(f.close)
+    else:
+        await write(file)
@@ -0,0 +1,131 @@
+'''Streaming export of unformatted files to Apache Arrow record batches, written to Parquet or
+Arrow IPC files with one table per LineType. The lines are read with iunformat_lines and the
+values of each LineType are buffered for at most batch_size lines, so memory use is bounded
+no matter how large the file is.
+
+The schema of each table is derived from the member format specs: int specs (e.g. d) give
+int64, float specs (f, e, g, fd, ...) give float64, and other specs give string (values that
+aren't strings, e.g. the datetimes of ti or %Y-%m-%d specs, are converted with str). Members
+with several fields give lists, and members interned with a CategoryTable give int64 codes.
+
+Usage:
+
+    >>> paths = export_path('model.dat.gz', line_rules, 'model_tables', format='parquet')
+    >>> paths[NodeLine]
+    'model_tables/NodeLine.parquet'
+'''
+
+import os
+try:
+    import pyarrow as pa
+except ImportError as err:
+    raise ImportError('Arrow export requires pyarrow.') from err
+from .minilang import field_specs, spec_value_type
+from .interning import CategoryTable
+from .streams import open_lines
+from .unformat_file import iunformat_lines
+
+arrow_types = {int:pa.int64(), float:pa.float64(), str:pa.string()}
+
+# file suffixes for the export formats
+format_suffixes = dict(parquet='.parquet', ipc='.arrow')
+
+
+def member_arrow_type(member, table=None):
+    '''The Arrow type for the values of a format group member.'''
+    if isinstance(table, CategoryTable):
+        return pa.int64()
+    try:
+        value_types = [spec_value_type(spec.type) for spec in field_specs(member._format_str)]
+    except ValueError:
+        # e.g. a datetime spec ('%Y-%m-%d')
+        return pa.string()
+    value_type = arrow_types[value_types[0]] if len(set(value_types)) == 1 else pa.string()
+    return pa.list_(value_type) if len(value_types) > 1 else value_type
+
+
+def arrow_schema(LineType):
+    '''The Arrow schema for the unformatted lines of a LineType; one column per member.'''
+    return pa.schema([(name, member_arrow_type(member, LineType._intern_tables.get(name)))
+                      for name, member in LineType._formatters.items()])
+
+
+def _str_values(column, arrow_type):
+    '''The values of a column of a string or list of strings type converted to str.'''
+    if pa.types.is_list(arrow_type):
+        return [None if value is None else _str_values(value, arrow_type.value_type) for value in column]
+    if pa.types.is_string(arrow_type):
+        return [value if value is None or isinstance(value, str) else str(value) for value in column]
+    return column
+
+
+def iunformat_batches(lines, line_rules, batch_size=65536):
+    '''Generates (LineType, pyarrow.RecordBatch) pairs for the lines of a file. Each batch holds
+    at most batch_size lines of a single LineType, in file order; blank lines are skipped.
+    raises TypeError if an invalid line sequence is encountered (see iunformat_lines)'''
+    schemas = {}
+    buffers = {}
+    def batch(LineType):
+        schema = schemas[LineType]
+        columns = buffers[LineType]
+        buffers[LineType] = [[] for _ in columns]
+        return pa.RecordBatch.from_arrays([pa.array(_str_values(column, field.type), type=field.type)
+                                           for column, field in zip(columns, schema)], schema=schema)
+    for LineType, unformat in iunformat_lines(lines, line_rules):
+        if LineType is None:
+            continue
+        try:
+            columns = buffers[LineType]
+        except KeyError:
+            schemas[LineType] = arrow_schema(LineType)
+            columns = buffers[LineType] = [[] for _ in LineType._formatters]
+        for column, value in zip(columns, unformat.fixed):
+            column.append(value)
+        if len(columns[0]) >= batch_size:
+            yield LineType, batch(LineType)
+    for LineType, columns in buffers.items():
+        if columns[0]:
+            yield LineType, batch(LineType)
+
+
+def _open_writer(path, schema, format):
+    if format == 'parquet':
+        import pyarrow.parquet as pq
+        return pq.ParquetWriter(path, schema)
+    elif format == 'ipc':
+        import pyarrow.ipc
+        return pa.ipc.new_file(path, schema)
+    raise ValueError('Unknown export format {!r}; use one of: {}.'.format(format, ', '.join(format_suffixes)))
+
+
+def export_lines(lines, line_rules, directory, format='parquet', batch_size=65536):
+    '''Unformat lines and write the values of each LineType to its own Parquet or Arrow IPC
+    (format='ipc') file in the directory, named after the LineType. Returns the
+    {LineType: path} mapping of the written files.'''
+    if format not in format_suffixes:
+        raise ValueError('Unknown export format {!r}; use one of: {}.'.format(format, ', '.join(format_suffixes)))
+    os.makedirs(directory, exist_ok=True)
+    paths = {}
+    writers = {}
+    try:
+        for LineType, batch in iunformat_batches(lines, line_rules, batch_size):
+            try:
+                writer = writers[LineType]
+            except KeyError:
+                path = paths[LineType] = os.path.join(directory, LineType.__name__ + format_suffixes[format])
+                writer = writers[LineType] = _open_writer(path, batch.schema, format)
+            if format == 'parquet':
+                writer.write_table(pa.Table.from_batches([batch]))
+            else:
+                writer.write_batch(batch)
+    finally:
+        for writer in writers.values():
+            writer.close()
+    return paths
+
+
+def export_path(path, line_rules, directory, format='parquet', batch_size=65536, encoding=None):
+    '''export_lines for a plain or compressed (gzip, xz, bz2) file.'''
+    with open_lines(path, encoding=encoding) as f:
+        # parse patterns must match the line exactly, so line endings are removed
+        return export_lines((line.rstrip('\n') for line in f), line_rules, directory, format, batch_size)
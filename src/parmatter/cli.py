@@ -0,0 +1,422 @@
+'''Command line entry point for bulk conversion of files (decks) between formatted text and
+columnar outputs. A schema module (a module name or a path to a .py file) defines the format
+groups and the line_rules:
+
+    parmatter unformat schema.py model.dat.gz model.npz --workers 4
+    parmatter format schema.py model.npz model.dat
+    parmatter unformat mypackage.schema model.dat model_csv --stream --profile
+
+Columnar outputs (chosen by --to, or by the output path suffix):
+    csv: a directory with one <LineType>.csv file per LineType (a header row of member names)
+        and _index.csv giving the LineType name of each line in file order (empty for blank
+        lines); multi-field member values are written as JSON arrays
+    npz: a NumPy .npz file with the _types (LineType names) and _index arrays and one
+        <LineType>.<member> array per member column (requires numpy)
+    jsonl: one JSON object per line, {"type": <LineType name>, "members": {...}}, and
+        {"type": null} for blank lines (compressed according to the suffix, e.g. .jsonl.gz)
+
+By default the whole file is unformatted before the output is written, so a file with an
+invalid line sequence produces no output; with --stream, csv and jsonl outputs are written as
+the lines are read, in bounded memory. With --workers, lines are converted (or records are
+formatted) in a pool of threads, --chunk-size lines at a time. --profile prints the cProfile
+statistics of the main thread (or dumps them to a file) and the throughput per LineType.'''
+
+import argparse
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import contextlib
+import cProfile
+import csv
+import importlib
+import importlib.util
+import json
+import os
+import pathlib
+import pstats
+import sys
+import time
+from .format_file import format_lines
+from .minilang import field_specs, spec_value_type
+from .parallel import iunformat_parallel, shards
+from .streams import open_lines
+from .unformat_file import iunformat_lines, columns_from_items, line_types
+
+columnar_formats = ('csv', 'npz', 'jsonl')
+
+# name of the csv file and npz arrays giving the LineType of each line
+index_name = '_index'
+types_name = '_types'
+
+
+def load_schema(schema, rules='line_rules'):
+    '''Import a schema module (a module name or a path to a .py file). Returns its line_rules
+    and the {name: LineType} mapping of the LineTypes they use (see line_types).'''
+    if schema.endswith('.py') or os.sep in schema:
+        path = pathlib.Path(schema)
+        if not path.is_file():
+            raise ValueError('The schema file {!r} does not exist.'.format(schema))
+        spec = importlib.util.spec_from_file_location(path.stem, path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    else:
+        module = importlib.import_module(schema)
+    try:
+        line_rules = getattr(module, rules)
+    except AttributeError:
+        raise ValueError('The schema {!r} has no {!r} attribute.'.format(schema, rules)) from None
+    return line_rules, line_types(line_rules)
+
+
+def path_format(path):
+    '''The columnar format for a path: csv unless the suffix is .npz or .jsonl.'''
+    suffixes = pathlib.Path(path).suffixes
+    if '.npz' in suffixes:
+        return 'npz'
+    if '.jsonl' in suffixes:
+        return 'jsonl'
+    return 'csv'
+
+
+def _numpy():
+    try:
+        import numpy as np
+    except ImportError as err:
+        raise ImportError('The npz format requires numpy.') from err
+    return np
+
+
+class Throughput():
+    '''Number of lines and seconds per LineType (None for blank lines).'''
+    def __init__(self):
+        self.lines = {}
+        self.seconds = {}
+    def add(self, LineType, seconds, lines=1):
+        self.lines[LineType] = self.lines.get(LineType, 0) + lines
+        self.seconds[LineType] = self.seconds.get(LineType, 0) + seconds
+    def update(self, other):
+        for LineType, lines in other.lines.items():
+            self.add(LineType, other.seconds[LineType], lines)
+    def report(self, file=None):
+        '''Print a table of lines, seconds and lines per second for each LineType.'''
+        print('{:<24} {:>10} {:>10} {:>12}'.format('LineType', 'lines', 'seconds', 'lines/s'), file=file)
+        for LineType, lines in sorted(self.lines.items(), key=lambda item: -self.seconds[item[0]]):
+            seconds = self.seconds[LineType]
+            name = '(blank)' if LineType is None else LineType.__name__
+            print('{:<24} {:>10d} {:>10.3f} {:>12.0f}'.format(name, lines, seconds, lines/seconds if seconds else 0), file=file)
+
+
+def _timed(items, throughput):
+    '''Generates the (LineType, result) items, adding the time taken to produce each one to
+    the throughput of its LineType.'''
+    start = time.perf_counter()
+    for LineType, result in items:
+        throughput.add(LineType, time.perf_counter()-start)
+        yield LineType, result
+        start = time.perf_counter()
+
+
+def _decoders(LineType):
+    '''The (member index, decode) pairs of the members of a LineType stored as category codes.'''
+    return [(i, table.decode) for i, table in LineType._category_members]
+
+
+def _rows(items):
+    '''Generates (LineType, member values) pairs from (LineType, values) pairs, with category
+    codes decoded.'''
+    decoders = {}
+    for LineType, values in items:
+        if LineType is None:
+            yield None, None
+            continue
+        try:
+            decode = decoders[LineType]
+        except KeyError:
+            decode = decoders[LineType] = _decoders(LineType)
+        values = list(values)
+        for i, decoder in decode:
+            values[i] = decoder(values[i])
+        yield LineType, values
+
+
+def result_rows(items):
+    '''(LineType, member values) pairs from (LineType, LineType.unformat result) pairs.'''
+    return _rows((LineType, result and result.fixed) for LineType, result in items)
+
+
+def column_rows(unformat_columns):
+    '''(LineType, member values) pairs in file order from an UnformatColumns.'''
+    types, index, columns = unformat_columns
+    type_rows = {LineType:zip(*type_columns.values()) for LineType, type_columns in columns.items()}
+    return _rows((types[code], types[code] and next(type_rows[types[code]])) for code in index)
+
+
+def write_jsonl(rows, path):
+    '''Write (LineType, member values) pairs to a JSON lines file.'''
+    with open_lines(path, 'w') as f:
+        for LineType, values in rows:
+            if LineType is None:
+                record = {'type':None}
+            else:
+                record = {'type':LineType.__name__, 'members':dict(zip(LineType._formatters, values))}
+            f.write(json.dumps(record)+'\n')
+
+
+def write_csv(rows, directory):
+    '''Write (LineType, member values) pairs to a directory of csv files.'''
+    directory = pathlib.Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    with contextlib.ExitStack() as stack:
+        def writer(name, header):
+            f = stack.enter_context(open(directory/(name+'.csv'), 'w', newline=''))
+            w = csv.writer(f)
+            w.writerow(header)
+            return w
+        index = writer(index_name, ['type'])
+        writers = {}
+        for LineType, values in rows:
+            if LineType is None:
+                index.writerow([''])
+                continue
+            try:
+                w = writers[LineType]
+            except KeyError:
+                w = writers[LineType] = writer(LineType.__name__, LineType._formatters)
+            index.writerow([LineType.__name__])
+            w.writerow([json.dumps(value) if isinstance(value, (list, tuple)) else value for value in values])
+
+
+def write_npz(unformat_columns, path):
+    '''Write an UnformatColumns to a NumPy .npz file.'''
+    np = _numpy()
+    types, index, columns = unformat_columns
+    arrays = {types_name:np.array(['' if LineType is None else LineType.__name__ for LineType in types], dtype=str),
+              index_name:np.asarray(index)}
+    for LineType, type_columns in columns.items():
+        decode = dict(_decoders(LineType))
+        for i, (name, column) in enumerate(type_columns.items()):
+            if i in decode:
+                column = [decode[i](code) for code in column]
+            arrays['{}.{}'.format(LineType.__name__, name)] = np.asarray(column)
+    with open(path, 'wb') as f:
+        np.savez(f, **arrays)
+
+
+def _line_type(types, name):
+    try:
+        return types[name]
+    except KeyError:
+        raise ValueError('Unknown LineType {!r}.'.format(name)) from None
+
+
+def read_jsonl(path, types):
+    '''Generates (LineType, record) pairs from a JSON lines file written by write_jsonl.
+    types: {name: LineType} mapping (see line_types)'''
+    with open_lines(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if record['type'] is None:
+                yield None, None
+            else:
+                yield _line_type(types, record['type']), record['members']
+
+
+def _csv_converters(LineType):
+    '''The function converting the csv cell text of each member back to its value.'''
+    def converter(value_types):
+        if len(value_types) > 1:
+            return json.loads
+        value_type = value_types[0]
+        if value_type is str:
+            return str
+        return lambda text: value_type(text) if text else None
+    return {name:converter([spec_value_type(spec.type) for spec in field_specs(member._format_str)] or [str])
+            for name, member in LineType._formatters.items()}
+
+
+def read_csv(directory, types):
+    '''Generates (LineType, record) pairs from a directory written by write_csv.
+    types: {name: LineType} mapping (see line_types)'''
+    directory = pathlib.Path(directory)
+    with contextlib.ExitStack() as stack:
+        readers = {}
+        def reader(name):
+            LineType = _line_type(types, name)
+            rows = csv.reader(stack.enter_context(open(directory/(name+'.csv'), newline='')))
+            header = next(rows)
+            converters = _csv_converters(LineType)
+            converters = [converters[member] for member in header]
+            return LineType, header, converters, rows
+        index = csv.reader(stack.enter_context(open(directory/(index_name+'.csv'), newline='')))
+        next(index)
+        for name, in index:
+            if not name:
+                yield None, None
+                continue
+            try:
+                LineType, header, converters, rows = readers[name]
+            except KeyError:
+                LineType, header, converters, rows = readers[name] = reader(name)
+            yield LineType, {member:convert(text) for member, convert, text in zip(header, converters, next(rows))}
+
+
+def read_npz(path, types):
+    '''Generates (LineType, record) pairs from a NumPy .npz file written by write_npz.
+    types: {name: LineType} mapping (see line_types)'''
+    np = _numpy()
+    with np.load(path, allow_pickle=False) as data:
+        row_types = [name and _line_type(types, name) for name in data[types_name].tolist()]
+        index = data[index_name].tolist()
+        columns = {LineType:{name:data['{}.{}'.format(LineType.__name__, name)].tolist() for name in LineType._formatters}
+                   for LineType in row_types if LineType}
+    positions = dict.fromkeys(columns, 0)
+    for code in index:
+        LineType = row_types[code]
+        if not LineType:
+            yield None, None
+            continue
+        i = positions[LineType]
+        positions[LineType] = i + 1
+        yield LineType, {name:column[i] for name, column in columns[LineType].items()}
+
+
+writers = dict(csv=write_csv, jsonl=write_jsonl)
+readers = dict(csv=read_csv, jsonl=read_jsonl, npz=read_npz)
+
+
+def _format_chunk(chunk, timed=False):
+    '''The formatted text of a chunk of (LineType, record) pairs, and its Throughput if timed.'''
+    if not timed:
+        return ''.join(line+'\n' for line in format_lines(chunk)), None
+    throughput = Throughput()
+    lines = []
+    for item in chunk:
+        start = time.perf_counter()
+        lines.extend(format_lines((item,)))
+        throughput.add(item[0], time.perf_counter()-start)
+    return ''.join(line+'\n' for line in lines), throughput
+
+
+def iformat_chunks(items, workers=1, chunk_size=10000, throughput=None):
+    '''Generates the formatted text of successive chunks of (LineType, record) pairs, in order,
+    formatting the chunks in a pool of threads when workers > 1. The formatting time of each
+    LineType is added to the throughput if provided.'''
+    timed = throughput is not None
+    def text(result):
+        text, chunk_throughput = result
+        if timed:
+            throughput.update(chunk_throughput)
+        return text
+    if workers <= 1:
+        for chunk in shards(items, chunk_size):
+            yield text(_format_chunk(chunk, timed))
+        return
+    with ThreadPoolExecutor(workers, thread_name_prefix='parmatter-format') as executor:
+        pending = deque()
+        for chunk in shards(items, chunk_size):
+            if len(pending) >= 2*workers:
+                yield text(pending.popleft().result())
+            pending.append(executor.submit(_format_chunk, chunk, timed))
+        while pending:
+            yield text(pending.popleft().result())
+
+
+def unformat_command(args, throughput=None):
+    '''Convert a formatted file to a columnar output.'''
+    line_rules, _ = load_schema(args.schema, args.rules)
+    to = args.to or path_format(args.output)
+    if args.stream and to == 'npz':
+        raise ValueError('The npz format can not be streamed; use csv or jsonl.')
+    with open_lines(args.input, encoding=args.encoding) as f:
+        # parse patterns must match the line exactly, so line endings are removed
+        lines = (line.rstrip('\n') for line in f)
+        if args.workers > 1:
+            items = iunformat_parallel(lines, line_rules, args.workers, args.chunk_size)
+        else:
+            items = iunformat_lines(lines, line_rules)
+        if throughput is not None:
+            items = _timed(items, throughput)
+        if args.stream:
+            writers[to](result_rows(items), args.output)
+            return
+        columns = columns_from_items(items)
+    if to == 'npz':
+        write_npz(columns, args.output)
+    else:
+        writers[to](column_rows(columns), args.output)
+
+
+def format_command(args, throughput=None):
+    '''Convert a columnar input back to a formatted file.'''
+    _, types = load_schema(args.schema, args.rules)
+    source = args.source or ('csv' if os.path.isdir(args.input) else path_format(args.input))
+    items = readers[source](args.input, types)
+    with open_lines(args.output, 'w', encoding=args.encoding) as f:
+        f.writelines(iformat_chunks(items, args.workers, args.chunk_size, throughput))
+
+
+def _positive_int(text):
+    value = int(text)
+    if value < 1:
+        raise argparse.ArgumentTypeError('must be a positive integer')
+    return value
+
+
+def argument_parser():
+    parser = argparse.ArgumentParser(prog='parmatter', description='Bulk conversion of formatted '
+                                     'files to and from columnar outputs (csv, npz, jsonl).')
+    commands = parser.add_subparsers(dest='command', required=True)
+    unformat = commands.add_parser('unformat', help='convert a formatted file to a columnar output')
+    fmat = commands.add_parser('format', help='convert a columnar input back to a formatted file')
+    for command in (unformat, fmat):
+        command.add_argument('schema', help='module name or .py file defining the format groups and line_rules')
+        command.add_argument('input')
+        command.add_argument('output')
+        command.add_argument('--rules', default='line_rules', help='name of the line_rules in the schema module')
+        command.add_argument('--encoding', help='encoding of the formatted file')
+        command.add_argument('--workers', type=_positive_int, default=1, help='number of worker threads')
+        command.add_argument('--chunk-size', type=_positive_int, default=10000, help='lines per chunk of work')
+        command.add_argument('--profile', nargs='?', const='-', metavar='STATS_FILE',
+                             help='print cProfile statistics and the throughput per LineType to stderr; '
+                                  'the statistics are dumped to STATS_FILE if provided')
+    unformat.add_argument('--to', choices=columnar_formats, help='output format (default: by the output suffix)')
+    unformat.add_argument('--stream', action='store_true', help='write the csv or jsonl output as the lines are read')
+    fmat.add_argument('--from', dest='source', choices=columnar_formats, help='input format (default: by the input suffix)')
+    unformat.set_defaults(run=unformat_command)
+    fmat.set_defaults(run=format_command)
+    return parser
+
+
+def run(args):
+    '''Run a parsed command, with profiling if requested.'''
+    if args.profile is None:
+        args.run(args)
+        return
+    throughput = Throughput()
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        args.run(args, throughput)
+    finally:
+        profiler.disable()
+        stats = pstats.Stats(profiler, stream=sys.stderr)
+        if args.profile == '-':
+            stats.sort_stats('cumulative').print_stats(25)
+        else:
+            stats.dump_stats(args.profile)
+        throughput.report(sys.stderr)
+
+
+def main(argv=None):
+    parser = argument_parser()
+    args = parser.parse_args(argv)
+    try:
+        run(args)
+    except (TypeError, ValueError, KeyError, OSError, ImportError) as err:
+        parser.exit(1, '{}: error: {}\n'.format(parser.prog, err))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
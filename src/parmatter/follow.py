@@ -0,0 +1,96 @@
+'''Follow (tail) mode for files that are appended to while they are being read, such as solver
+logs and result decks. Each poll reads and unformats only the newly appended complete lines,
+resuming from the remembered file offset and line_rules state. Truncated or rotated files are
+read again from the start. Only simple polling of the file is used.
+
+Usage:
+
+    >>> follower = LineFollower(path, line_rules)
+    >>> struct, result = follower.poll()
+    >>> # ... more lines are written to the file ...
+    >>> struct, result = follower.poll()
+'''
+
+import os
+import time
+from .unformat_file import iunformat_lines, IncompleteBlockError, UnformatFile
+
+
+class LineFollower():
+    '''Incrementally unformats the lines appended to a (plain text) file.'''
+    def __init__(self, path, line_rules, encoding='utf-8'):
+        self.path = path
+        self.line_rules = line_rules
+        self.encoding = encoding
+        self.reset()
+        self._identity = None
+    def reset(self):
+        '''Start again from the beginning of the file.'''
+        # byte offset and number of the next line to be read
+        self.offset = 0
+        self.line_number = 1
+        # LineType of the last line read
+        self.prev_type = None
+    def poll(self):
+        '''Unformat the complete lines appended since the last poll. Returns an UnformatFile.
+
+        A line declaring a repeat count is not read until all of its counted lines have
+        been appended. Raises TypeError if an invalid line is encountered; the state is then
+        left unchanged.'''
+        file_struct = []
+        file_items = []
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            # rotated away and not yet replaced
+            return UnformatFile(file_struct, file_items)
+        identity = stat.st_dev, stat.st_ino
+        if identity != self._identity or stat.st_size < self.offset:
+            # new (rotated) or truncated file
+            self.reset()
+            self._identity = identity
+        if stat.st_size == self.offset:
+            return UnformatFile(file_struct, file_items)
+        # offsets of the lines that have been read
+        offsets = [self.offset]
+        with open(self.path, 'rb') as f:
+            f.seek(self.offset)
+            def complete_lines():
+                for raw in f:
+                    if not raw.endswith(b'\n'):
+                        # still being written
+                        return
+                    offsets.append(offsets[-1] + len(raw))
+                    yield raw.decode(self.encoding).rstrip('\r\n')
+            try:
+                for LineType, unformat in iunformat_lines(complete_lines(), self.line_rules,
+                                                          prev_type=self.prev_type, first_line=self.line_number):
+                    file_struct.append(LineType)
+                    file_items.append(unformat)
+            except IncompleteBlockError as exc:
+                # wait for the rest of the block; the count line is read again next time
+                del file_struct[exc.line_number-self.line_number:]
+                del file_items[exc.line_number-self.line_number:]
+        # move past the lines that were read
+        if file_struct:
+            self.offset = offsets[len(file_struct)]
+            self.line_number += len(file_struct)
+            self.prev_type = file_struct[-1]
+        return UnformatFile(file_struct, file_items)
+
+
+def follow(path, line_rules, interval=1.0, idle_timeout=None, encoding='utf-8'):
+    '''Generates (LineType, LineType.unformat result) pairs for a file as lines are appended
+    to it, polling every interval seconds. Stops after idle_timeout seconds without new lines
+    (never if None).'''
+    follower = LineFollower(path, line_rules, encoding)
+    idle_since = time.monotonic()
+    while True:
+        struct, result = follower.poll()
+        if struct:
+            idle_since = time.monotonic()
+            yield from zip(struct, result)
+        elif idle_timeout is not None and time.monotonic()-idle_since >= idle_timeout:
+            return
+        else:
+            time.sleep(interval)
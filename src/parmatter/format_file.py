@@ -0,0 +1,33 @@
+from collections.abc import Mapping
+from .streams import open_lines
+
+
+def format_record(LineType, record):
+    '''Format a record with a LineType. The record can be a Mapping or namedtuple (members by
+    name), a sequence of member values, a single value, or a parse.Result (uses .fixed).
+    Category codes in unformat results are decoded (see FormatGroupMeta.decode).'''
+    record = getattr(record, 'fixed', record)
+    if type(record) is getattr(LineType, '_Data', None):
+        record = LineType.decode(record)
+    if isinstance(record, (Mapping, str)) or hasattr(record, '_asdict') or not hasattr(record, '__iter__'):
+        return LineType.format(record)
+    return LineType.format(*record)
+
+
+def format_lines(items):
+    '''Generates formatted lines (without line endings) from (LineType, record) pairs.
+    A LineType of None produces a blank line.'''
+    for LineType, record in items:
+        yield '' if LineType is None else format_record(LineType, record)
+
+
+def format_path(path, items, encoding=None):
+    '''Write formatted lines from (LineType, record) pairs to a plain or compressed file 
+    (compression is chosen by the path suffix: .gz, .xz, .bz2). The pairs can be taken from 
+    an UnformatFile, e.g.:
+    
+        format_path('out.txt.gz', zip(*unformat_lines(lines, line_rules)))
+    '''
+    with open_lines(path, 'w', encoding=encoding) as f:
+        for line in format_lines(items):
+            f.write(line+'\n')
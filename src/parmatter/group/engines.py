@@ -0,0 +1,270 @@
+'''Unformat and format engines for format groups, and calibration to pin the fastest correct
+engine per group.
+
+Unformat engines:
+    parse: the joined parse module regex (FormatGroupMeta.unformat)
+    specialized: the generated unformat function (see the codegen module)
+    slice: generated direct slicing of fixed-width columns; only available when every member
+        is a single field with a width and a plain int, float or str spec type. Each column is
+        checked against the regex the parser uses for its field (groups without a sep are
+        also checked against the whole regex of the group, as its parser joins the members
+        with a space), and lines failing any check are handed to the parse engine, so the slice engine matches exactly the lines the
+        parse engine matches (line-type detection is unchanged when it is pinned)
+
+Format engines:
+    vformat: FormatGroupMeta.format
+    specialized: the generated format function (see the codegen module)
+
+Calibration times the engines on a sample of real lines and pins the fastest one whose results
+are identical to the parse and vformat engines for every line of the sample (including lines
+that don't match). The choice can be recorded in an EngineStore file so that later runs skip
+the timing:
+
+    >>> store = EngineStore('engines.json')
+    >>> NodeLine.calibrate(sample_lines, store)
+    Calibration(unformat='slice', format='specialized', timings={...})
+
+A pinned unformat engine is only used when evaluate_result is True, and a pinned format engine
+only for positional str, int and float arguments; other calls use the default engines.'''
+
+from collections import namedtuple as nt
+import hashlib
+import json
+import linecache
+import os
+import timeit
+import parse
+from ..minilang import parse_spec
+from ..registry import compile_parser
+from .codegen import _inline_fields
+from .meta import cache_lock
+
+Calibration = nt('Calibration', 'unformat format timings')
+
+unformat_engines = ('parse', 'specialized', 'slice')
+format_engines = ('vformat', 'specialized')
+
+# value types of the spec types the slice engine can convert
+slice_types = dict(**{t:int for t in 'd'}, **{t:float for t in 'fFeEgG'}, **{t:str for t in ('s', '')})
+
+# argument types for which a pinned format engine is used
+_scalar_types = {str, int, float}
+
+
+def _slice_fields(cls):
+    '''The (FormatSpec, value type) of each member for the slice engine, or None if the group
+    can't be sliced.'''
+    fields = []
+    for formatter in cls:
+        parts = _inline_fields(formatter)
+        if parts is None or len(parts) != 1 or parts[0][0]:
+            return None
+        spec = parse_spec(parts[0][2], strict=False)
+        if not spec.width or spec.type not in slice_types:
+            return None
+        fields.append((spec, slice_types[spec.type]))
+    return fields or None
+
+
+def slice_unformat_source(cls, namespace):
+    '''Source code for a slice engine unformat function, or None if the group can't be
+    sliced. The names used by the code are added to the namespace.'''
+    fields = _slice_fields(cls)
+    if fields is None:
+        return None
+    meta = type(cls)
+    namespace.update(_Result=parse.Result, _Data=cls._Data, _int=int, _float=float,
+                     _parse=lambda string: meta.unformat(cls, string))
+    extra_types = getattr(cls, '_extra_types', dict(s=str))
+    lines = ['def unformat(string):',
+             '    s = string[{}:]'.format(len(cls._prefix)) if cls._prefix else '    s = string']
+    checks = []
+    values = []
+    spans = []
+    start = 0
+    for i, ((name, formatter), (spec, value_type)) in enumerate(zip(cls._formatters.items(), fields)):
+        if i and cls._sep:
+            checks.append('    if s[{}:{}] != {!r}:\n        return _parse(string)'.format(start, start+len(cls._sep), cls._sep))
+            start += len(cls._sep)
+        end = start + int(spec.width)
+        if i and not cls._sep:
+            # the parser joins the members with a space (see FormatGroupMeta._compile_parser)
+            checks.append("    if s[{}:{}] != ' ':\n        return _parse(string)".format(start, start+1))
+            start += 1
+        fill = spec.fill or ' '
+        align = spec.align or ('<' if value_type is str else '>')
+        raw = 's[{}:{}]'.format(start, end)
+        # the regex of the field in the parser (e.g. rejects 1_0 for d and 1e2 for f)
+        namespace['_m{}'.format(i)] = compile_parser(formatter._format_str, extra_types)._match_re.match
+        checks.append('    if _m{}({}) is None:\n        return _parse(string)'.format(i, raw))
+        if align == '>':
+            lines.append('    v{} = {}.lstrip({!r})'.format(i, raw, fill))
+            spans.append('{0}: ({1}-len(v{0}), {1})'.format(i, end))
+        elif align == '<':
+            lines.append('    v{} = {}.rstrip({!r})'.format(i, raw, fill))
+            spans.append('{0}: ({1}, {1}+len(v{0}))'.format(i, start))
+        else:
+            lines.append('    r{0} = {1}\n    v{0} = r{0}.strip({2!r})\n    a{0} = {3}+len(r{0})-len(r{0}.lstrip({2!r}))'.format(i, raw, fill, start))
+            spans.append('{0}: (a{0}, a{0}+len(v{0}))'.format(i))
+        checks.append('    if not v{}:\n        return _parse(string)'.format(i))
+        value = {int:'_int(v{})', float:'_float(v{})', str:'v{}'}[value_type].format(i)
+        if name in cls._intern_tables:
+            namespace['_t_'+name] = cls._intern_tables[name]
+            value = '_t_{}({})'.format(name, value)
+        values.append(value)
+        start = end
+    lines.insert(2, '    if len(s) != {}:\n        return _parse(string)'.format(start))
+    if len(fields) > 1 and not cls._sep:
+        # the space joining the members may be matched by the padding of either column
+        namespace['_match'] = cls.parser()._match_re.match
+        checks.append('    if _match(string) is None:\n        return _parse(string)')
+    lines.extend(checks)
+    lines.append('    try:\n        data = _Data({})\n    except ValueError:\n        return _parse(string)'.format(', '.join(values)))
+    lines.append('    return _Result(data, {{}}, {{{}}})'.format(', '.join(spans)))
+    return '\n'.join(lines) + '\n'
+
+
+def slice_unformat(cls):
+    '''The slice engine unformat function for a group, or None if the group can't be sliced.'''
+    namespace = {}
+    source = slice_unformat_source(cls, namespace)
+    if source is None:
+        return None
+    filename = '<{} slice>'.format(cls.__name__)
+    exec(compile(source, filename, 'exec'), namespace)
+    linecache.cache[filename] = (len(source), None, source.splitlines(True), filename)
+    return namespace['unformat']
+
+
+def unformat_engine(cls, name):
+    '''The unformat(string) function of an engine, or None if it isn't available.'''
+    if name == 'parse':
+        return lambda string: type(cls).unformat(cls, string)
+    if name == 'specialized':
+        try:
+            return cls.specialize().unformat
+        except ValueError:
+            return None
+    if name == 'slice':
+        return slice_unformat(cls)
+    raise ValueError('Unknown unformat engine {!r}.'.format(name))
+
+
+def format_engine(cls, name):
+    '''The format(*args) function of an engine.'''
+    if name == 'vformat':
+        return lambda *args: type(cls).format(cls, *args)
+    if name == 'specialized':
+        return cls.specialize().format
+    raise ValueError('Unknown format engine {!r}.'.format(name))
+
+
+def pin(cls, unformat='parse', format='vformat'):
+    '''Use the named engines for the unformat and format methods of the group. The engines are
+    swapped under a lock; calls made meanwhile from other threads use either engine.'''
+    meta = type(cls)
+    pinned = {}
+    if unformat != 'parse':
+        fast_unformat = unformat_engine(cls, unformat)
+        if fast_unformat is None:
+            raise ValueError('The {!r} unformat engine is not available for {}.'.format(unformat, cls.__name__))
+        def pinned_unformat(string, evaluate_result=True):
+            if evaluate_result:
+                return fast_unformat(string)
+            return meta.unformat(cls, string, evaluate_result)
+        pinned['unformat'] = pinned_unformat
+    if format != 'vformat':
+        fast_format = format_engine(cls, format)
+        def pinned_format(*args, **kwargs):
+            if kwargs or not all(type(arg) in _scalar_types for arg in args):
+                return meta.format(cls, *args, **kwargs)
+            return fast_format(*args)
+        pinned['format'] = pinned_format
+    with cache_lock:
+        for attr in ('unformat', 'format'):
+            if attr in pinned:
+                setattr(cls, attr, pinned[attr])
+            elif attr in cls.__dict__:
+                delattr(cls, attr)
+        cls._engines = unformat, format
+
+
+def fingerprint(cls):
+    '''Identifies a group definition in an EngineStore.'''
+    definition = (cls.__name__, cls._prefix, cls._sep, cls._formatter_type.__qualname__,
+                  [(name, formatter._format_str) for name, formatter in cls._formatters.items()])
+    return hashlib.sha1(repr(definition).encode()).hexdigest()
+
+
+class EngineStore():
+    '''A JSON file recording the engines chosen for format groups by calibration.'''
+    def __init__(self, path):
+        self.path = path
+        try:
+            with open(path) as f:
+                self._engines = json.load(f)
+        except FileNotFoundError:
+            self._engines = {}
+    def get(self, cls):
+        '''The recorded (unformat, format) engine names for a group, or None.'''
+        try:
+            return tuple(self._engines[fingerprint(cls)])
+        except KeyError:
+            return None
+    def set(self, cls, unformat, format):
+        '''Record the engines for a group and save the file.'''
+        self._engines[fingerprint(cls)] = [unformat, format]
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self._engines, f, indent=1, sort_keys=True)
+        os.replace(tmp, self.path)
+
+
+def _same_result(a, b):
+    if a is None or b is None:
+        return a is b
+    return (a.fixed, a.named, a.spans) == (b.fixed, b.named, b.spans)
+
+
+def _best(engines, reference, sample, same, repeat):
+    '''The name of the fastest engine giving the same results as the reference for the whole
+    sample, and the timings of the engines.'''
+    expected = [reference(*args) for args in sample]
+    timings = {}
+    for name, engine in engines.items():
+        if engine is None:
+            continue
+        try:
+            if not all(same(engine(*args), result) for args, result in zip(sample, expected)):
+                continue
+        except Exception:
+            continue
+        timings[name] = min(timeit.repeat(lambda: [engine(*args) for args in sample], number=1, repeat=repeat))
+    return min(timings, key=timings.get), timings
+
+
+def calibrate(cls, lines, store=None, repeat=3):
+    '''Time the engines on a sample of lines, pin the fastest correct ones and record them in
+    the store (if provided). If the store already has a record for the group, the recorded
+    engines are pinned without timing.'''
+    recorded = store.get(cls) if store is not None else None
+    if recorded is not None:
+        pin(cls, *recorded)
+        return Calibration(*recorded, {})
+    # timed and checked without any pinned engines
+    pin(cls)
+    lines = [(line,) for line in lines]
+    engines = {name:unformat_engine(cls, name) for name in unformat_engines}
+    unformat, unformat_timings = _best(engines, engines['parse'], lines, _same_result, repeat)
+    records = [tuple(result.fixed) for result in (engines['parse'](line) for line, in lines) if result is not None]
+    engines = {name:format_engine(cls, name) for name in format_engines}
+    if records:
+        format, format_timings = _best(engines, engines['vformat'], records, lambda a, b: a == b, repeat)
+    else:
+        format, format_timings = 'vformat', {}
+    pin(cls, unformat, format)
+    if store is not None:
+        store.set(cls, unformat, format)
+    timings = {('unformat', name):t for name, t in unformat_timings.items()}
+    timings.update({('format', name):t for name, t in format_timings.items()})
+    return Calibration(unformat, format, timings)
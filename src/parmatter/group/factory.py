@@ -2,7 +2,7 @@ from .meta import FormatGroupMeta
 from ..utilities import set_item_if
 from .. import VersatileParmatter
 
-def FormatGroup(name, meta=FormatGroupMeta, formatter_type=VersatileParmatter, *, prefix = '', sep = '', **kwargs):
+def FormatGroup(name, meta=FormatGroupMeta, formatter_type=VersatileParmatter, *, prefix = '', sep = '', count = None, intern = None, key = None, **kwargs):
     '''Factory for producing classes that define lines composed of formatting members 
     with optional line prefixes and separators between members. Formatter type must 
     provide a static args_parse() method with a signature of: 
@@ -12,14 +12,22 @@ def FormatGroup(name, meta=FormatGroupMeta, formatter_type=VersatileParmatter, *
 
     The meta can be a subclass of SpecialAttrsMeta.
     
+    count: optional (member name, LineType) tuple; the member value is the number of
+    LineType lines that immediately follow (see unformat_file.iunformat_lines).
+    intern: optional member names, or mapping of member names to tables, through which
+    unformatted values are routed (see the interning module).
+    key: optional member name; unformatted lines are indexed by the member value (see
+    the key_index module).
+    
     Usage:
     
         LineDef = FormatGroup('LineDef', a = '{: 5>s}', prefix = 'my prefix', sep = ', ')
         DefaultLineDef = FormatGroup('DefaultLineDef', a = ('{: 5>s}','foo'), prefix = 'my prefix', sep = ', ')
+        CountLineDef = FormatGroup('CountLineDef', n = '{: >5d}', count = ('n', LineDef))
     '''
     # check the namespace for special item conflicts
     meta.special_check(**kwargs)
     # add special items to the namespace
-    factory_specials = '_prefix _sep _formatter_type'.split()
-    set_item_if(kwargs, factory_specials, (prefix, sep, formatter_type), lambda o,n,v: v is not None)
+    factory_specials = '_prefix _sep _formatter_type _count _intern _key'.split()
+    set_item_if(kwargs, factory_specials, (prefix, sep, formatter_type, count, intern, key), lambda o,n,v: v is not None)
     return meta(name, (), kwargs)
@@ -1,7 +1,42 @@
 from ..utilities import args_kwargs_from_args
+from ..registry import compile_parser
+from ..interning import intern_tables, CategoryTable
 from collections import OrderedDict as od, namedtuple as nt
+from operator import itemgetter
+from types import MappingProxyType
+import threading
 import parse
 
+# guards the lazily built caches of format groups (projections and pinned engines)
+cache_lock = threading.Lock()
+
+class GroupDefinition(nt('GroupDefinition', 'meta name members prefix sep formatter_type count intern key',
+                          defaults=(None, (), None))):
+    '''The definition of a format group. The meta and formatter_type must be importable
+    for the definition to be pickled.
+
+    count: the (member name, GroupDefinition) of the _count declaration, or None
+    intern: (member name, table type, maxsize) of each interned member; the rebuilt group
+        gets new, empty tables
+    key: the _key member name, or None'''
+    __slots__ = ()
+    def build(self):
+        '''Build a new format group class from the definition.'''
+        mapping = dict(self.members, _prefix=self.prefix, _sep=self.sep, _formatter_type=self.formatter_type)
+        if self.count is not None:
+            count_member, definition = self.count
+            mapping['_count'] = count_member, definition.build()
+        if self.intern:
+            mapping['_intern'] = {name:table_type(maxsize) for name, table_type, maxsize in self.intern}
+        if self.key is not None:
+            mapping['_key'] = self.key
+        return self.meta(self.name, (), mapping)
+
+def is_positional_field(member_parse):
+    '''Test whether a (literal_text, field_name, format_spec, conversion) tuple from
+    Formatter.parse is a positional (fixed) field.'''
+    return member_parse[1:3]!=(None,None) and (member_parse[1] == '' or parse.parse('{:d}',member_parse[1]) is not None or parse.parse('{:d}{}',member_parse[1]) is not None)
+
 class SpecialAttrsMeta(type):
     '''A base metaclass that removes special attribute names from the namespace
     prior to passing them for initialization.
@@ -47,8 +82,17 @@ class FormatGroupMeta(SpecialAttrsMeta):
             a = '{: 5>s}', 'foo'
             b = '{: 10>f}', 0
             c = '{}'
+            
+    The optional _count attribute is a (member name, LineType) tuple declaring that the member
+    value is the number of LineType lines immediately following the line.
+    
+    The optional _intern attribute is a sequence of member names, or a mapping of member names
+    to tables (see the interning module), through which unformatted member values are routed.
+    
+    The optional _key attribute is the name of a member whose values identify the lines; 
+    unformatted lines are then indexed by key (see the key_index module).
     '''
-    _special = '_prefix _sep _formatter_type _formatters'.split()
+    _special = '_prefix _sep _formatter_type _formatters _count _intern _key'.split()
     def __init__(cls, name, bases, mapping):
         formatter_type = cls._formatter_type
         formatter_defs = {k:v for k,v in mapping.items() if not k.startswith('_') and not callable(v)}
@@ -60,13 +104,46 @@ class FormatGroupMeta(SpecialAttrsMeta):
             formatter_args[k], formatter_kwargs[k] = formatter_type.args_parse(*args)
         formatters = (formatter_type(*formatter_args[k], **formatter_kwargs[k]) for k in formatter_defs)
         # pass each set of args and kwargs to the formatter type
-        cls._formatters = {k:formatter for k,formatter in zip(formatter_defs,formatters)}
+        # read-only after construction (groups are shared between threads)
+        cls._formatters = MappingProxyType({k:formatter for k,formatter in zip(formatter_defs,formatters)})
+        # kept for rebuilding the class elsewhere (e.g. in worker processes)
+        cls._formatter_defs = MappingProxyType(formatter_defs)
         # attempt to grab extra types dict from an existing compiler (assume all of them are identical)
         try:
-            cls._extra_types = next(iter(cls._formatters.values()))._parser._extra_types
+            cls._extra_types = MappingProxyType(next(iter(cls._formatters.values()))._parser._extra_types)
         # no existing compiler 
         except (AttributeError, StopIteration):
             pass
+        # check the repeat count declaration
+        try:
+            count_member, _ = cls._count
+        except AttributeError:
+            pass
+        else:
+            if count_member not in cls._formatters:
+                raise ValueError('The count member {!r} is not a member of {}.'.format(count_member, name))
+        # check the key declaration
+        key_member = getattr(cls, '_key', None)
+        if key_member is not None and key_member not in cls._formatters:
+            raise ValueError('The key member {!r} is not a member of {}.'.format(key_member, name))
+        # the number of positional fields of each member and the unformat result type
+        cls._fixed_counts = tuple(len([member_parse for member_parse in member.parse(member._format_str) if is_positional_field(member_parse)]) for member in cls)
+        cls._Data = nt(name+'Data', ' '.join(cls._formatters))
+        # tables for interning unformatted member values
+        cls._intern_tables = MappingProxyType(intern_tables(getattr(cls, '_intern', ()), cls._formatters))
+        # the (member index, table) of the members stored as category codes (see decode)
+        cls._category_members = tuple((i, cls._intern_tables[name]) for i, name in enumerate(cls._formatters)
+                                      if isinstance(cls._intern_tables.get(name), CategoryTable))
+        # member projections (see projection)
+        cls._projections = {}
+        # the shared compiled parser, looked up once (see parser)
+        cls._parser = cls._compile_parser()
+        # all the raw fixed fields of a match in one call (see raw_fields)
+        fields = cls._parser._fixed_fields
+        if len(fields) == 1:
+            cls._raw_groups = lambda groups: (groups[fields[0]],)
+        else:
+            cls._raw_groups = itemgetter(*fields) if fields else (lambda groups: ())
         cls.__init__(name,bases,mapping)
     def format(cls, *args, _asdict=True, _popmappings=True, **unified_namespace):
         '''Return a combined formatted string using joined formatter members.
@@ -108,6 +185,80 @@ class FormatGroupMeta(SpecialAttrsMeta):
 
         Return a parse.Result or parse.Match instance or None if there's no match.
         '''
+        result = cls._parser.parse(string[len(cls._prefix):], evaluate_result=evaluate_result)
+        # replace default output tuple with namedtuple
+        if evaluate_result and result is not None and result.fixed:
+            result.fixed = cls._fixed_data(result.fixed)
+        return result
+    def evaluate(cls, match):
+        '''Evaluate a parse.Match from unformat(string, evaluate_result=False) into the 
+        parse.Result that unformat(string) returns.'''
+        result = match.evaluate_result()
+        if result.fixed:
+            result.fixed = cls._fixed_data(result.fixed)
+        return result
+    def decode(cls, fixed):
+        '''The member values (Data namedtuple) of an unformat result with category codes 
+        replaced by their values (see the interning module).'''
+        if not cls._category_members:
+            return fixed
+        values = list(fixed)
+        for i, table in cls._category_members:
+            values[i] = table.decode(values[i])
+        return cls._Data._make(values)
+    def raw_fields(cls, match):
+        '''The raw (unconverted) text of the fields of a parse.Match from unformat(string, 
+        evaluate_result=False), grouped by member into a Data namedtuple.'''
+        fixed = cls._raw_groups(match.match.groups())
+        if len(fixed) == len(cls._fixed_counts):
+            return cls._Data._make(fixed)
+        fixed = iter(fixed)
+        results = ([next(fixed) for _ in range(count)] for count in cls._fixed_counts)
+        return cls._Data(*(r if len(r)>1 else r[0] for r in results))
+    def projection(cls, members):
+        '''A function evaluating only the named members of a parse.Match from unformat(string, 
+        evaluate_result=False). The fixed attribute of the resulting parse.Result is a 
+        namedtuple of those members.'''
+        members = tuple(members)
+        try:
+            return cls._projections[members]
+        except KeyError:
+            pass
+        with cache_lock:
+            try:
+                return cls._projections[members]
+            except KeyError:
+                project = cls._projections[members] = cls._projection(members)
+                return project
+    def _projection(cls, members):
+        unknown = set(members) - set(cls._formatters)
+        if unknown:
+            raise ValueError('Projection of non-members of {}: {}.'.format(cls.__name__, ', '.join(sorted(unknown))))
+        parser = cls.parser()
+        # the (field index, regex group index, converter) of the fields of each member
+        fields = iter([(i, n, parser._type_conversions.get(n)) for i, n in enumerate(parser._fixed_fields)])
+        member_fields = {name:[next(fields) for _ in range(count)] for name, count in zip(cls._formatters, cls._fixed_counts)}
+        plan = [(member_fields[name], cls._intern_tables.get(name)) for name in members]
+        Data = nt(cls.__name__+'Data', ' '.join(members))
+        def project(match):
+            m = match.match
+            groups = m.groups()
+            values = []
+            spans = {}
+            for fields, table in plan:
+                r = []
+                for i, n, conv in fields:
+                    r.append(groups[n] if conv is None else conv(groups[n], m))
+                    spans[i] = m.span(n+1)
+                value = r if len(r)>1 else r[0]
+                values.append(value if table is None else table(value))
+            return parse.Result(Data(*values), {}, spans)
+        return project
+    def parser(cls):
+        '''The shared compiled parser for the joined member format strings (compiled or 
+        taken from the parser registry when the class is built).'''
+        return cls._parser
+    def _compile_parser(cls):
         fmat_str = (cls._sep if cls._sep else ' ').join(member._format_str for member in cls)
         # try to get extra type from precompiled parser set at initialization
         try:
@@ -115,23 +266,52 @@ class FormatGroupMeta(SpecialAttrsMeta):
         # parser wasn't precompiled so just assume the default
         except AttributeError:
             extra_types = dict(s=str)
-        print('fmat_str:\n', fmat_str, 'string:\n', string[len(cls._prefix):], sep='\n')
-        result = parse.parse(fmat_str, string[len(cls._prefix):], extra_types, evaluate_result=evaluate_result)
-        # replace default output tuple with namedtuple
-        if result is not None and result.fixed:
-            result.fixed=list(result.fixed)
-            def is_positional_field(member_parse):
-                return member_parse[1:3]!=(None,None) and (member_parse[1] == '' or parse.parse('{:d}',member_parse[1]) is not None or parse.parse('{:d}{}',member_parse[1]) is not None)
-            fixed_counts=[len([member_parse for member_parse in member.parse(member._format_str) if is_positional_field(member_parse)]) for member in cls]
-            results=[]
-            for count in fixed_counts:
-                r=[]
-                for _ in range(count):
-                    r.append(result.fixed.pop(0))
-                results.append(r)
-            NT=nt(cls.__name__+'Data', ' '.join(cls._formatters))
-            result.fixed=NT(*(r if len(r)>1 else r[0] for r in results))
-        return result
+        return compile_parser(fmat_str, extra_types)
+    def _fixed_data(cls, fixed):
+        '''Group the fixed fields of a parse result by member into a namedtuple.'''
+        fixed = iter(fixed)
+        results = ([next(fixed) for _ in range(count)] for count in cls._fixed_counts)
+        values = (r if len(r)>1 else r[0] for r in results)
+        if cls._intern_tables:
+            tables = cls._intern_tables
+            values = (tables[name](value) if name in tables else value for name, value in zip(cls._formatters, values))
+        return cls._Data(*values)
+    def specialize(cls):
+        '''Generate, exec, and cache dedicated format and unformat functions for the group, 
+        with the members, separators, prefix and converters inlined. 
+        
+        Returns a Specialized namedtuple; the generated code is available as its source
+        attribute. Call again after changing the prefix, separator, or members.'''
+        from .codegen import specialize
+        cls._specialized = specialize(cls)
+        return cls._specialized
+    def calibrate(cls, lines, store=None, repeat=3):
+        '''Time the unformat and format engines on a sample of lines and pin the fastest ones 
+        giving identical results (see the engines module). The choice is recorded in the 
+        store (an EngineStore) if provided, and later calibrations read it instead of timing.'''
+        from .engines import calibrate
+        return calibrate(cls, lines, store, repeat)
+    def pin_engines(cls, unformat='parse', format='vformat'):
+        '''Use the named unformat and format engines for the group (see the engines module).'''
+        from .engines import pin
+        pin(cls, unformat, format)
+    def definition(cls):
+        '''A picklable definition from which the class can be rebuilt (see GroupDefinition).'''
+        try:
+            count_member, BlockType = cls._count
+        except AttributeError:
+            count = None
+        else:
+            count = count_member, BlockType.definition()
+        intern = tuple((name, type(table), table.maxsize) for name, table in cls._intern_tables.items())
+        return GroupDefinition(type(cls), cls.__name__, dict(cls._formatter_defs), cls._prefix, cls._sep, cls._formatter_type,
+                               count, intern, getattr(cls, '_key', None))
+    def format_columns(cls, *columns, file=None, **named_columns):
+        '''Format entire columns of member values at once using NumPy (see the vectorize
+        module). Takes one array per member (or a structured array) and returns an array 
+        of lines, which are also written in bulk to the file if provided.'''
+        from .vectorize import format_columns
+        return format_columns(cls, *columns, file=file, **named_columns)
         
     def __iter__(cls):
         yield from cls._formatters.values()
\ No newline at end of file
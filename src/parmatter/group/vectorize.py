@@ -0,0 +1,122 @@
+'''NumPy-vectorized formatting of format group members: entire columns of values are
+rendered at once using the member format specs, then joined into lines with the group
+prefix and separators.
+
+Usage:
+
+    >>> NodeLine = FormatGroup('NodeLine', Num = '{: >5d}', X = ('{: >10f}', 0), Y = ('{: >10f}', 0))
+    >>> NodeLine.format_columns(np.arange(1, 3), np.array([0.0, 1.0]))
+    array(['    1  0.000000  0.000000', '    2  1.000000  0.000000'], dtype='<U25')
+'''
+
+try:
+    import numpy as np
+except ImportError as err:
+    raise ImportError('Vectorized formatting requires numpy.') from err
+from ..minilang import parse_spec
+
+# spec types with an equivalent printf-style conversion
+percent_types = set('dfFeEgGxXos')
+int_types = set('dxXo')
+
+
+def _percent_format(spec):
+    '''The printf-style format (without width padding) equivalent to a FormatSpec,
+    or None if there isn't one.'''
+    spec_type = spec.type.replace('blank', '').replace('fd', 'f')
+    if spec_type not in percent_types or spec.comma or spec.align == '=':
+        return None
+    if spec_type in int_types and spec.precision is not None:
+        return None
+    # zero padding is handled by printf-style only without an explicit alignment
+    if spec.zero is not None and spec.align is None:
+        width = '0{}'.format(spec.width or '')
+    else:
+        width = ''
+    precision = '.{}'.format(spec.precision) if spec.precision is not None else ''
+    return '%{}{}{}{}{}'.format(spec.sign if spec.sign in ('+', ' ') else '', spec.alt or '', width, precision, spec_type)
+
+
+def _pad(column, spec, default_align):
+    '''Pad a column of strings per the spec width, fill, and alignment.'''
+    if not spec.width or (spec.zero is not None and spec.align is None):
+        return column
+    # format fills with zeros when a 0 flag is given with an alignment but no fill
+    fill = spec.fill or ('0' if spec.zero is not None else ' ')
+    align = spec.align or default_align
+    width = int(spec.width)
+    if align == '^':
+        # format puts the odd padding character on the right (np.char.center doesn't)
+        left = np.maximum(width - np.char.str_len(column), 0) // 2
+        return np.char.ljust(np.char.add(np.char.multiply(fill, left), column), width, fill)
+    pad = {'<':np.char.ljust, '>':np.char.rjust}[align]
+    return pad(column, width, fill)
+
+
+def format_column(member, values):
+    '''Render an array of values for a single-field member into an array of strings.
+
+    Values with no printf-style equivalent spec are formatted one at a time by the member.'''
+    parts = list(member.parse(member._format_str))
+    fields = [part for part in parts if part[1] is not None]
+    if len(fields) != 1 or fields[0][1] not in ('', '0') or fields[0][3] is not None:
+        raise ValueError('Only members with a single positional field can be formatted as columns.')
+    values = np.asarray(values)
+    spec = parse_spec(fields[0][2], strict=False)
+    percent = _percent_format(spec)
+    numeric = values.dtype.kind in 'iuf'
+    if (percent is None or (percent[-1] == 's') == numeric or (percent[-1] in int_types and values.dtype.kind == 'f')
+        or ('blank' in spec.type and not numeric)):
+        # no vectorized equivalent; let the member do it
+        return np.frompyfunc(member.format, 1, 1)(values).astype(str)
+    column = _pad(np.char.mod(percent, values), spec, '<' if percent[-1] == 's' else '>')
+    if 'blank' in spec.type:
+        # falsey values appear blank (see BlankBase)
+        blank = format(' ', spec._replace(type='s').join())
+        column = np.where(values == 0, blank, column)
+    # literal text of the member format string
+    field_index = parts.index(fields[0])
+    head = ''.join(part[0] for part in parts[:field_index+1])
+    tail = ''.join(part[0] for part in parts[field_index+1:])
+    if head:
+        column = np.char.add(head, column)
+    if tail:
+        column = np.char.add(column, tail)
+    return column
+
+
+def format_columns(cls, *columns, file=None, **named_columns):
+    '''Format entire columns of values (one array per member, in member order or by member
+    name) into an array of lines. A single structured array can also be provided, with fields
+    named for the members. Members without a column use their default value.
+
+    The lines are written in bulk to the file, if provided.'''
+    if len(columns) == 1 and getattr(columns[0], 'dtype', None) is not None and columns[0].dtype.names:
+        structured = columns[0]
+        columns = ()
+        named_columns = dict({name:structured[name] for name in structured.dtype.names}, **named_columns)
+    members = list(cls._formatters)
+    if len(columns) > len(members):
+        raise ValueError('More columns were provided than the {} members of {}.'.format(len(members), cls.__name__))
+    named_columns.update(zip(members, columns))
+    unknown = set(named_columns) - set(members)
+    if unknown:
+        raise ValueError('Columns provided for non-members: {}.'.format(', '.join(sorted(unknown))))
+    lengths = {len(column) for column in named_columns.values()}
+    if len(lengths) != 1:
+        raise ValueError('Columns must be of equal length.')
+    n = lengths.pop()
+    lines = np.full(n, cls._prefix)
+    for i, (name, member) in enumerate(cls._formatters.items()):
+        if i and cls._sep:
+            lines = np.char.add(lines, cls._sep)
+        if name in named_columns:
+            column = format_column(member, named_columns[name])
+        else:
+            # default (or missing) values are the same on every line
+            column = member.format()
+        lines = np.char.add(lines, column)
+    if file is not None:
+        for start in range(0, n, 65536):
+            file.write(''.join(line+'\n' for line in lines[start:start+65536].tolist()))
+    return lines
@@ -0,0 +1,83 @@
+'''Interning of repeated unformatted values, such as string columns holding a handful of
+material names or flags. Format group members are routed through a table by declaring them
+with the intern option of FormatGroup (or the _intern attribute of a FormatGroupMeta class):
+
+    >>> Elem = FormatGroup('Elem', Num = '{: >5d}', Mat = '{: >8s}', intern = ('Mat',))
+    >>> Elem = FormatGroup('Elem', Num = '{: >5d}', Mat = '{: >8s}', intern = dict(Mat = CategoryTable()))
+
+Members named in a sequence get an InternTable of the default size. The tables are safe to
+use from multiple threads.'''
+
+import threading
+
+
+class InternTable():
+    '''A bounded table of shared values; equal values are replaced by a single shared
+    object. Once full, new values are passed through without being interned.'''
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self._values = {}
+    def __call__(self, value):
+        try:
+            return self._values[value]
+        except KeyError:
+            if len(self._values) < self.maxsize:
+                # the first value stored by any thread is shared
+                return self._values.setdefault(value, value)
+            return value
+        except TypeError:
+            # unhashable (e.g. members with multiple fields)
+            return value
+    def __len__(self):
+        return len(self._values)
+    def clear(self):
+        self._values.clear()
+
+
+class CategoryTable():
+    '''A bounded table storing values as small integer codes. The value for a code is
+    looked up using decode() or the categories list.'''
+    def __init__(self, maxsize=65536):
+        self.maxsize = maxsize
+        self.categories = []
+        self._codes = {}
+        self._lock = threading.Lock()
+    def __call__(self, value):
+        try:
+            return self._codes[value]
+        except KeyError:
+            pass
+        with self._lock:
+            # another thread may have added the value meanwhile
+            try:
+                return self._codes[value]
+            except KeyError:
+                if len(self.categories) >= self.maxsize:
+                    raise ValueError('The category table is full ({} values).'.format(self.maxsize)) from None
+                code = len(self.categories)
+                self.categories.append(value)
+                self._codes[value] = code
+                return code
+    def decode(self, code):
+        '''The value for a code.'''
+        return self.categories[code]
+    def __len__(self):
+        return len(self.categories)
+    def clear(self):
+        with self._lock:
+            self.categories.clear()
+            self._codes.clear()
+
+
+def intern_tables(intern, members):
+    '''Build the member name to table mapping for the intern option of a format group.'''
+    if isinstance(intern, str):
+        intern = (intern,)
+    try:
+        tables = dict(intern.items())
+    except AttributeError:
+        tables = {name:InternTable() for name in intern}
+    unknown = set(tables) - set(members)
+    if unknown:
+        raise ValueError('Intern tables declared for non-members: {}.'.format(', '.join(sorted(unknown))))
+    return tables
@@ -0,0 +1,103 @@
+'''Indexes of unformatted lines by the value of a key member, such as a node or element
+number. The key member is declared using the key option of FormatGroup (or the _key attribute
+of a FormatGroupMeta class), and the index is built as the lines are read:
+
+    >>> NodeLine = FormatGroup('NodeLine', Num = '{: >5d}', X = '{: >10f}', key = 'Num')
+    >>> struct, result, keys = unformat_lines(lines, line_rules, keyed=True)
+    >>> result[keys[NodeLine][1001]]
+    >>> [result[i] for i in keys[NodeLine].range(1001, 2001)]
+
+Positions are indexes into the unformat_lines result list.'''
+
+from array import array
+from bisect import bisect_left
+
+
+class KeyIndex():
+    '''Maps the key member values of the lines of one LineType to their positions. Lookup
+    by key is a dict access; range queries use a sorted copy of the keys, built on demand
+    (no sorting is needed if the keys were added in ascending order).'''
+    def __init__(self, LineType):
+        self.LineType = LineType
+        self.member = LineType._key
+        self._positions = {}
+        # sorted (keys, positions); None when out of date
+        self._sorted = None
+        self._ascending = True
+        self._last = None
+    def add(self, key, position):
+        '''Index the position of a line. Raises ValueError for a duplicate key.'''
+        if isinstance(key, list):
+            # member with several fields
+            key = tuple(key)
+        if key in self._positions:
+            raise ValueError('Duplicate {} key {!r} at positions {:d} and {:d}.'
+                             ''.format(self.LineType.__name__, key, self._positions[key], position))
+        self._positions[key] = position
+        if self._ascending and self._last is not None and not self._last < key:
+            self._ascending = False
+        self._last = key
+        self._sorted = None
+    def add_result(self, result, position):
+        '''Index the position of a LineType.unformat result.'''
+        self.add(getattr(result.fixed, self.member), position)
+    def __getitem__(self, key):
+        return self._positions[key]
+    def get(self, key, default=None):
+        return self._positions.get(key, default)
+    def __contains__(self, key):
+        return key in self._positions
+    def __len__(self):
+        return len(self._positions)
+    def keys(self):
+        '''The keys in ascending order.'''
+        return self._sorted_items()[0]
+    def _sorted_items(self):
+        if self._sorted is None:
+            items = self._positions.items()
+            if not self._ascending:
+                items = sorted(items)
+            keys = [key for key, _ in items]
+            positions = array('q', (position for _, position in items))
+            # int keys are stored compactly
+            if all(type(key) is int for key in keys):
+                keys = array('q', keys)
+            self._sorted = keys, positions
+        return self._sorted
+    def range(self, start=None, stop=None):
+        '''The positions of the lines with start <= key < stop, in key order. None means
+        unbounded.'''
+        keys, positions = self._sorted_items()
+        i = 0 if start is None else bisect_left(keys, start)
+        j = len(keys) if stop is None else bisect_left(keys, stop)
+        return positions[i:j]
+
+
+class KeyIndexes(dict):
+    '''The {LineType: KeyIndex} mapping for the keyed LineTypes of a file, built as the 
+    lines are read (see add).'''
+    def __init__(self):
+        super().__init__()
+        # LineTypes without a key member
+        self._unkeyed = set()
+    def add(self, LineType, result, position):
+        '''Index the position of a LineType.unformat result (ignored for LineTypes without
+        a key member).'''
+        try:
+            index = self[LineType]
+        except KeyError:
+            if LineType in self._unkeyed:
+                return
+            if getattr(LineType, '_key', None) is None:
+                self._unkeyed.add(LineType)
+                return
+            index = self[LineType] = KeyIndex(LineType)
+        index.add_result(result, position)
+
+
+def key_indexes(struct, result):
+    '''Build the KeyIndexes for the struct and result lists produced by unformat_lines.'''
+    indexes = KeyIndexes()
+    for position, (LineType, unformat) in enumerate(zip(struct, result)):
+        indexes.add(LineType, unformat, position)
+    return indexes
@@ -0,0 +1,182 @@
+'''A line offset index for random access into large (uncompressed) files. The index records
+the byte offset and the detected LineType (using the line_rules state machine) of every line
+in a single pass. It is saved in a compact array-backed sidecar file, which is memory mapped
+when loaded; records are then read from the memory mapped file on demand.
+
+Usage:
+
+    >>> index = get_index(path, line_rules)
+    >>> index.count(NodeLine)
+    4
+    >>> [r.fixed.Num for r in unformat_records(path, index, NodeLine, 2, 4)]
+    [3, 4]
+'''
+
+from array import array
+from bisect import bisect_left
+import json
+import mmap
+import os
+import struct
+from .streams import detect_compression
+from .unformat_file import iunformat_lines, UnformatFile, line_types
+
+sidecar_suffix = '.pmidx'
+sidecar_version = 1
+
+
+def index_path(path):
+    '''The default sidecar path for a file.'''
+    return os.fspath(path) + sidecar_suffix
+
+
+class LineIndex():
+    '''Byte offsets and LineTypes of every line of a file.
+
+    types: list of LineTypes (None for blank lines)
+    offsets: start offset of every line, followed by the offset of the end of the file
+    codes: index into types for every line
+    positions: for each LineType, the line numbers (zero based) of its records'''
+    def __init__(self, types, offsets, codes, positions, stat=None):
+        self.types = types
+        self.offsets = offsets
+        self.codes = codes
+        self.positions = positions
+        self.stat = stat
+    def __len__(self):
+        return len(self.codes)
+    def line_type(self, line):
+        '''The LineType of a line (zero based).'''
+        return self.types[self.codes[line]]
+    def count(self, LineType):
+        '''The number of records of a LineType.'''
+        try:
+            return len(self.positions[LineType])
+        except KeyError:
+            return 0
+    def record_lines(self, LineType, start=0, stop=None):
+        '''The line numbers (zero based) of a range of records of a LineType.'''
+        return self.positions[LineType][start:stop]
+    def record_number(self, LineType, line):
+        '''The position of the first record of a LineType at or after a line.'''
+        return bisect_left(self.positions[LineType], line)
+    def save(self, path):
+        '''Write the index to a sidecar file.'''
+        header = dict(version=sidecar_version,
+                      types=[None if LineType is None else LineType.__name__ for LineType in self.types],
+                      lines=len(self), counts=[len(self.positions[LineType]) for LineType in self.types],
+                      code_typecode=self.codes.typecode, stat=self.stat)
+        header = json.dumps(header).encode()
+        # keep the arrays aligned
+        header += b' '*(-len(header) % 8)
+        # replace rather than overwrite; the old sidecar may still be memory mapped
+        temp_path = os.fspath(path) + '.tmp'
+        with open(temp_path, 'wb') as f:
+            f.write(struct.pack('<Q', len(header)))
+            f.write(header)
+            f.write(array('q', self.offsets).tobytes())
+            for LineType in self.types:
+                f.write(array('q', self.positions[LineType]).tobytes())
+            f.write(array(self.codes.typecode, self.codes).tobytes())
+        os.replace(temp_path, path)
+    @classmethod
+    def load(cls, path, line_rules):
+        '''Memory map an index sidecar file. The LineType names are resolved using line_rules.'''
+        with open(path, 'rb') as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(mm)
+        header_length, = struct.unpack_from('<Q', mm)
+        header = json.loads(bytes(view[8:8+header_length]))
+        if header['version'] != sidecar_version:
+            raise ValueError('Unsupported index version: {}.'.format(header['version']))
+        names = line_types(line_rules)
+        # blank lines
+        names[None] = None
+        try:
+            types = [names[name] for name in header['types']]
+        except KeyError as err:
+            raise ValueError('The line type {} is not in the line rules.'.format(err.args[0])) from None
+        def arrays(typecode, *lengths, start=8+header_length):
+            size = struct.calcsize(typecode)
+            for length in lengths:
+                yield view[start:start+length*size].cast(typecode)
+                start += length*size
+        offsets, *positions = arrays('q', header['lines']+1, *header['counts'])
+        codes = next(arrays(header['code_typecode'], header['lines'],
+                            start=8+header_length+8*(header['lines']+1+sum(header['counts']))))
+        return cls(types, offsets, codes, dict(zip(types, positions)), header['stat'])
+
+
+def file_stat(path):
+    '''The size and modification time used to check whether an index is up to date.'''
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def build_index(path, line_rules, encoding='utf-8'):
+    '''Index a file in one pass using the line_rules state machine (see unformat_lines).'''
+    if detect_compression(path) is not None:
+        raise ValueError('Compressed files cannot be indexed for random access.')
+    stat = file_stat(path)
+    offsets = array('q', [0])
+    with open(path, 'rb') as f:
+        def decoded_lines():
+            position = 0
+            for raw in f:
+                position += len(raw)
+                offsets.append(position)
+                yield raw.decode(encoding).rstrip('\r\n')
+        types = []
+        type_codes = {}
+        codes = array('B')
+        positions = {}
+        for line, (LineType, _) in enumerate(iunformat_lines(decoded_lines(), line_rules, evaluate_result=False)):
+            try:
+                code = type_codes[LineType]
+            except KeyError:
+                code = type_codes[LineType] = len(types)
+                types.append(LineType)
+                positions[LineType] = array('q')
+                # widen the codes when there are too many types for a byte
+                if code == 256:
+                    codes = array('H', codes)
+            codes.append(code)
+            positions[LineType].append(line)
+    return LineIndex(types, offsets, codes, positions, stat)
+
+
+def get_index(path, line_rules, sidecar=None, encoding='utf-8'):
+    '''Load the sidecar index of a file, (re)building and saving it if it is missing or out of date.'''
+    sidecar = index_path(path) if sidecar is None else sidecar
+    try:
+        index = LineIndex.load(sidecar, line_rules)
+    except (OSError, ValueError):
+        pass
+    else:
+        if index.stat == file_stat(path):
+            return index
+    index = build_index(path, line_rules, encoding)
+    index.save(sidecar)
+    return index
+
+
+def _decoded(mm, index, line, encoding):
+    return mm[index.offsets[line]:index.offsets[line+1]].decode(encoding).rstrip('\r\n')
+
+
+def unformat_records(path, index, LineType, start=0, stop=None, encoding='utf-8'):
+    '''Unformat a range of records of a LineType, reading only their lines from the memory
+    mapped file.'''
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        return [LineType.unformat(_decoded(mm, index, line, encoding)) for line in index.record_lines(LineType, start, stop)]
+
+
+def unformat_section(path, index, start=0, stop=None, encoding='utf-8'):
+    '''Unformat a range of lines (zero based) using the indexed LineTypes (no dispatch).
+    Returns an UnformatFile.'''
+    start, stop, _ = slice(start, stop).indices(len(index))
+    file_struct = [index.line_type(line) for line in range(start, stop)]
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        file_items = [None if LineType is None else LineType.unformat(_decoded(mm, index, line, encoding))
+                      for line, LineType in zip(range(start, stop), file_struct)]
+    return UnformatFile(file_struct, file_items)
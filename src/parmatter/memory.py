@@ -0,0 +1,153 @@
+'''Memory footprint reports for unformatted files, for choosing between the in-memory
+(unformat_lines), columnar (unformat_columns) and streaming (iunformat_lines) modes before
+reading a large file.
+
+The retained bytes of the results are measured per LineType and per member by traversing them
+with sys.getsizeof; objects shared between results (e.g. interned strings and small ints) are
+counted once. estimate_path reads only a sampled prefix of a file and extrapolates to the full
+(decompressed) file size; the in-memory estimate is checked against tracemalloc.
+
+Usage:
+
+    >>> report = memory_report(unformat_lines(lines, line_rules))
+    >>> report.types[NodeLine].members['X']
+    >>> estimate = estimate_path('model.dat', line_rules, sample_lines=10000)
+    >>> estimate.retained, estimate.columnar
+'''
+
+from collections import namedtuple as nt
+from array import array
+from itertools import islice
+import os
+import sys
+import tracemalloc
+import parse
+from .streams import open_lines, detect_compression, chunk_size
+from .unformat_file import UnformatFile, IncompleteBlockError, iunformat_lines, columns_from_items
+
+# members: {member name: bytes}; overhead: bytes of the Result objects, spans and Data tuples
+LineTypeMemory = nt('LineTypeMemory', 'lines total members overhead')
+MemoryReport = nt('MemoryReport', 'lines total containers types')
+# bytes are extrapolated to the full file; file_bytes is the decompressed size of compressed
+# files; traced is the tracemalloc measurement of retained
+Estimate = nt('Estimate', 'sample_lines sample_bytes file_bytes retained columnar traced')
+
+
+def deep_sizeof(obj, seen):
+    '''The size in bytes of an object and everything it refers to (containers, parse results,
+    and namedtuples), excluding the objects already seen.'''
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, (str, bytes, int, float, array)) or obj is None:
+        return size
+    if isinstance(obj, dict):
+        return size + sum(deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in obj.items())
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return size + sum(deep_sizeof(item, seen) for item in obj)
+    if isinstance(obj, (parse.Result, parse.Match)):
+        return size + deep_sizeof(vars(obj), seen)
+    return size
+
+
+def memory_report(unformat_file):
+    '''Measure the retained bytes of an UnformatFile (see unformat_lines) per LineType and per
+    member. The containers are the struct and result lists themselves.'''
+    struct, result = unformat_file
+    seen = set()
+    # the LineTypes are not part of the results
+    seen.update(id(LineType) for LineType in set(struct))
+    containers = deep_sizeof(struct, seen) + sys.getsizeof(result)
+    seen.add(id(result))
+    lines = {}
+    overheads = {}
+    members = {}
+    for LineType, unformat in zip(struct, result):
+        if unformat is None:
+            continue
+        lines[LineType] = lines.get(LineType, 0) + 1
+        member_bytes = members.setdefault(LineType, dict.fromkeys(LineType._formatters, 0))
+        # the Result object, its dicts and the Data tuple
+        overhead = sys.getsizeof(unformat) + deep_sizeof(unformat.named, seen) + deep_sizeof(unformat.spans, seen)
+        seen.add(id(unformat))
+        fixed = unformat.fixed
+        if id(fixed) not in seen:
+            seen.add(id(fixed))
+            overhead += sys.getsizeof(fixed)
+            for name, value in zip(member_bytes, fixed):
+                member_bytes[name] += deep_sizeof(value, seen)
+        overheads[LineType] = overheads.get(LineType, 0) + overhead
+    types = {LineType:LineTypeMemory(n, overheads[LineType]+sum(members[LineType].values()), members[LineType], overheads[LineType])
+             for LineType, n in lines.items()}
+    return MemoryReport(len(struct), containers + sum(t.total for t in types.values()), containers, types)
+
+
+def columns_sizeof(unformat_columns):
+    '''The retained bytes of an UnformatColumns (see unformat_columns).'''
+    types, index, columns = unformat_columns
+    seen = {id(LineType) for LineType in types}
+    return sys.getsizeof(types) + deep_sizeof(index, seen) + deep_sizeof(columns, seen)
+
+
+def text_size(path):
+    '''The size in bytes of a plain file, or the decompressed size of a compressed file (the
+    file is decompressed, but not decoded or parsed, to measure it).'''
+    opener = detect_compression(path)
+    if opener is None:
+        return os.path.getsize(path)
+    size = 0
+    with opener(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                return size
+            size += len(chunk)
+
+
+def unformat_sample(sample, line_rules):
+    '''unformat_lines for the lines of a sampled prefix of a file. A counted block cut off 
+    by the end of the sample is decoded up to the end of the sample instead of raising 
+    IncompleteBlockError.'''
+    struct = []
+    result = []
+    try:
+        for LineType, unformat in iunformat_lines(sample, line_rules):
+            struct.append(LineType)
+            result.append(unformat)
+    except IncompleteBlockError as exc:
+        # whole batches of the block may have been parsed after the line declaring the count
+        BlockType = struct[exc.line_number-1]._count[1]
+        for line in sample[len(struct):]:
+            unformat = BlockType.unformat(line)
+            if unformat is None:
+                break
+            struct.append(BlockType)
+            result.append(unformat)
+    return UnformatFile(struct, result)
+
+
+def estimate_path(path, line_rules, sample_lines=10000, encoding=None):
+    '''Estimate the memory needed to read a plain or compressed text file in the in-memory and
+    columnar modes, by reading the first sample_lines lines and scaling by the (decompressed)
+    file size. The streaming mode (iunformat_lines) retains only the current line.'''
+    with open_lines(path, encoding=encoding) as f:
+        sample = [line.rstrip('\n') for line in islice(f, sample_lines)]
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        unformat_file = unformat_sample(sample, line_rules)
+        traced = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        if not tracing:
+            tracemalloc.stop()
+    # only the lines parsed are measured
+    sample = sample[:len(unformat_file.struct)]
+    sample_bytes = sum(len(line.encode(encoding or 'utf-8'))+1 for line in sample)
+    file_bytes = text_size(path)
+    scale = file_bytes / sample_bytes if sample_bytes else 0
+    retained = memory_report(unformat_file).total
+    columnar = columns_sizeof(columns_from_items(zip(*unformat_file)))
+    return Estimate(len(sample), sample_bytes, file_bytes, int(retained*scale), int(columnar*scale), int(traced*scale))
@@ -9,12 +9,12 @@ import re
 
 # only mini-language types
 # regex original to me
-regex_minilang = r'(([\s\S])?([<>=\^]))?([\+\-])?([#])?([0])?(\d)*([,])?((\.)(\d)*)?([sbcdoxXneEfFgGn%]|$)?'
+regex_minilang = r'(([\s\S])?([<>=\^]))?([\+\- ])?([#])?([0])?(\d+)?([,])?((\.)(\d+)?)?([sbcdoxXneEfFgGn%]|$)?'
 minilang_parser = re.compile(regex_minilang)
 
-# any type using a-zA-Z for the name
+# any type using a-zA-Z for the name (or the % type)
 # regex original to me
-regex_custom=r'(([\s\S])?([<>=\^]))?([\+\- ])?([#])?([0])?(\d)*([,])?((\.)(\d)*)?([a-zA-Z]+|$)?'
+regex_custom=r'(([\s\S])?([<>=\^]))?([\+\- ])?([#])?([0])?(\d+)?([,])?((\.)(\d+)?)?([a-zA-Z]+|%|$)?'
 custom_parser = re.compile(regex_custom)
 
 # for parsing any format string with multiple fields
@@ -94,3 +94,26 @@ def parse_format_str(format_str):
             yield part
         else:
             yield safety_parser.sub(lambda match: '\\' + match.group(1), part)
+
+# python types produced by the parse module for each spec type (custom "fd" included)
+spec_value_types = dict(**{t:int for t in 'dnbox'}, **{t:float for t in 'fFeEgG%'}, fd=float)
+
+def spec_value_type(spec_type):
+    '''Returns the python type (int, float, or str) produced when a field with the 
+    provided spec type is unformatted. A "blank" suffix is ignored; other types give str.'''
+    return spec_value_types.get(spec_type.replace('blank', ''), str)
+
+def field_spec_strs(format_str):
+    '''Generates the format spec string of each replacement field in the format string.'''
+    for part in parse_format_str(format_str):
+        if part in ('{{', '}}') or part[0] != '{':
+            continue
+        try:
+            yield part[1:-1].split(':', 1)[1]
+        except IndexError:
+            yield ''
+
+def field_specs(format_str):
+    '''Generates a FormatSpec for each replacement field in the format string.'''
+    for spec in field_spec_strs(format_str):
+        yield parse_spec(spec, strict=False)
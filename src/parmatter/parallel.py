@@ -0,0 +1,208 @@
+'''Parallel formatting of large record sets. The records are split into shards, each shard is
+formatted by a worker, and the shard texts are written to the output in order. The output is
+identical to the serial path:
+
+    ''.join(format_record(cls, record)+'\\n' for record in records)
+
+Usage:
+
+    >>> format_parallel(NodeLine, records, 'nodes.txt.gz', workers=8)
+    >>> format_parallel(NodeLine, records, 'nodes.txt.gz', workers=8, backend='thread')
+
+With the process backend, the format group is rebuilt in each worker process from its
+definition: the format group meta and formatter type must be importable by the worker
+processes (the FormatGroup factory defaults are), and the records must be picklable. Unformat
+results (parse.Result or their fixed member values) are converted to plain tuples before
+they are sent to the workers. The thread backend shares the format group and records without pickling; threads run in parallel
+on free-threaded (no GIL) Python builds.
+
+Batch unformatting with a thread pool is provided by iunformat_parallel.'''
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import islice
+import os
+from .format_file import format_record
+from .unformat_file import iunformat_lines
+from .streams import open_lines
+from .pipeline import iunformat_pipeline
+
+backends = ('process', 'thread')
+
+# the format group rebuilt in each worker process
+_worker_group = None
+
+
+def _init_worker(definition):
+    global _worker_group
+    _worker_group = definition.build()
+
+
+def format_shard(cls, shard):
+    '''Format a shard of records into a single string of lines.'''
+    return ''.join(format_record(cls, record)+'\n' for record in shard)
+
+
+def _format_worker_shard(shard):
+    return format_shard(_worker_group, shard)
+
+
+def _plain_record(cls, record):
+    '''The member values of an unformat result as a tuple (with category codes decoded), or
+    the record unchanged. The Data namedtuples of format groups can't be pickled.'''
+    fixed = getattr(record, 'fixed', record)
+    if type(fixed) is getattr(cls, '_Data', None):
+        return tuple(cls.decode(fixed))
+    return fixed
+
+
+def shards(records, shard_size):
+    '''Generates successive shards of a sequence, array, or iterable of records.'''
+    try:
+        length = len(records)
+        records[0:0]
+    except TypeError:
+        # not sliceable
+        records = iter(records)
+        while True:
+            shard = list(islice(records, shard_size))
+            if not shard:
+                return
+            yield shard
+    else:
+        for start in range(0, length, shard_size):
+            yield records[start:start+shard_size]
+
+
+def _executor(cls, workers, backend):
+    '''The executor and the function submitting a shard to it for a backend.'''
+    if backend == 'process':
+        executor = ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(cls.definition(),))
+        return executor, lambda shard: executor.submit(_format_worker_shard, [_plain_record(cls, record) for record in shard])
+    if backend == 'thread':
+        executor = ThreadPoolExecutor(workers, thread_name_prefix='parmatter-format')
+        return executor, lambda shard: executor.submit(format_shard, cls, shard)
+    raise ValueError('Unknown backend {!r}; use one of: {}.'.format(backend, ', '.join(backends)))
+
+
+def iformat_parallel(cls, records, workers=None, shard_size=10000, backend='process'):
+    '''Generates the formatted text of each shard of records, in order. At most two shards
+    per worker are in flight at once. The backend is 'process' or 'thread'.'''
+    workers = os.cpu_count() if workers is None else workers
+    if workers <= 1:
+        for shard in shards(records, shard_size):
+            yield format_shard(cls, shard)
+        return
+    executor, submit = _executor(cls, workers, backend)
+    with executor:
+        pending = deque()
+        for shard in shards(records, shard_size):
+            if len(pending) >= 2*workers:
+                yield pending.popleft().result()
+            pending.append(submit(shard))
+        while pending:
+            yield pending.popleft().result()
+
+
+def format_parallel(cls, records, file=None, workers=None, shard_size=10000, backend='process'):
+    '''Format records in parallel workers (see iformat_parallel) and write them in order to
+    a file object or path (compressed according to the suffix; see format_path).
+
+    Returns the formatted text when no file is provided.'''
+    texts = iformat_parallel(cls, records, workers, shard_size, backend)
+    if file is None:
+        return ''.join(texts)
+    if isinstance(file, (str, os.PathLike)):
+        with open_lines(file, 'w') as f:
+            f.writelines(texts)
+    else:
+        file.writelines(texts)
+
+
+def _chain(shard, line_rules, prev_type, first_line):
+    '''The (LineType, result) items of a shard of lines following a line of prev_type, and
+    the TypeError raised by an invalid line (None if there is none).'''
+    items = []
+    try:
+        for item in iunformat_lines(shard, line_rules, prev_type=prev_type, first_line=first_line):
+            items.append(item)
+    except TypeError as exc:
+        return items, exc
+    return items, None
+
+
+def _speculate(shard, line_rules, candidates, first_line):
+    '''Unformat a shard for each LineType its first line matches. The LineType of the line 
+    before the shard, which decides between them, isn't known yet. Returns {LineType: chain}
+    (see _chain); the key is None if the first line is blank.'''
+    first = shard[0]
+    if not first.strip():
+        return {None:_chain(shard, line_rules, None, first_line)}
+    chains = {}
+    for LineType in candidates:
+        if LineType.unformat(first, False) is not None:
+            # the first line is read as LineType, the rest using the line_rules
+            rules = dict(line_rules)
+            rules[_shard_start] = (LineType,)
+            chains[LineType] = _chain(shard, rules, _shard_start, first_line)
+    return chains
+
+
+def _resolve(chains, shard, line_rules, prev_type, first_line):
+    '''The chain of a shard (see _speculate) for the LineType of the line before it.'''
+    if None in chains:
+        return chains[None]
+    for LineType in line_rules.get(prev_type, ()):
+        if LineType in chains:
+            return chains[LineType]
+    # the first line doesn't match; the error is raised as by iunformat_lines
+    return _chain(shard, line_rules, prev_type, first_line)
+
+
+# placeholder LineType preceding the first line of a shard
+_shard_start = object()
+
+
+def _iunformat_speculative(lines, line_rules, workers, shard_size):
+    candidates = list(dict.fromkeys(LineType for LineTypes in line_rules.values() for LineType in LineTypes))
+    PrevType = None
+    first_line = 1
+    with ThreadPoolExecutor(workers, thread_name_prefix='parmatter-unformat') as executor:
+        pending = deque()
+        def resolved():
+            nonlocal PrevType
+            shard, shard_line, future = pending.popleft()
+            items, error = _resolve(future.result(), shard, line_rules, PrevType, shard_line)
+            yield from items
+            if error is not None:
+                raise error
+            PrevType = items[-1][0]
+        for shard in shards(lines, shard_size):
+            if len(pending) >= 2*workers:
+                yield from resolved()
+            pending.append((shard, first_line, executor.submit(_speculate, shard, line_rules, candidates, first_line)))
+            first_line += len(shard)
+        while pending:
+            yield from resolved()
+
+
+def iunformat_parallel(lines, line_rules, workers=None, shard_size=10000):
+    '''Generates the LineType and LineType.unformat result for each line, like
+    iunformat_lines, matching and converting shards of lines in a pool of worker threads.
+
+    The LineType of the first line of a shard depends on the line before it, so each worker
+    unformats its shard speculatively for every LineType the first line matches, and the
+    chains are resolved in file order (almost always there is a single candidate). At most
+    two shards per worker are in flight at once. Category codes (see the interning module)
+    may be assigned in a different order than by iunformat_lines.
+
+    When a LineType declares a repeat count, a counted block can span shards; the lines are
+    then matched in a single thread and only converted in the pool (see the pipeline
+    module).
+    raises TypeError if an invalid line sequence is encountered (after the preceding lines
+    have been generated)'''
+    workers = os.cpu_count() if workers is None else workers
+    counted = any(hasattr(LineType, '_count') for LineTypes in line_rules.values() for LineType in LineTypes)
+    if counted:
+        return iunformat_pipeline(lines, line_rules, batch_size=shard_size, max_batches=2*workers, workers=workers)
+    return _iunformat_speculative(lines, line_rules, workers, shard_size)
@@ -4,24 +4,147 @@ from .base import ParmatterBase
 from ..utilities import args_kwargs_from_args
 from ..blank import make_blank
 from ..minilang import parse_spec, parse_format_str
-import parse as _parse # avoid name conflicts with parse methods
+from ..registry import compile_parser, spec_types, blank_bases
+from functools import wraps
+import _string
+import threading
+from types import MappingProxyType
+
+# read-only default extra types for parsers
+default_extra_types = MappingProxyType(dict(s=str))
+
+# guards changes to the partial format string caches of parmatters
+_partials_lock = threading.Lock()
 #NOTE: the parse module seems to have some trouble with string fields and spaces around them. don't implicitly trust it. 
 
+class DefaultNamespace(dict):
+    '''A default namespace dict that counts its changes, so that values derived from it
+    (see StaticParmatter.partial_format_str) are checked without comparing the dicts.'''
+    version = 0
+
+def _counting(method):
+    @wraps(method)
+    def counting(self, *args, **kwargs):
+        self.version += 1
+        return method(self, *args, **kwargs)
+    return counting
+
+for name in ('__setitem__', '__delitem__', '__ior__', 'clear', 'pop', 'popitem', 'setdefault', 'update'):
+    setattr(DefaultNamespace, name, _counting(getattr(dict, name)))
+del name
+
+
 class StaticParmatter(ParmatterBase):
     '''A parsing formatter with a designated format string.'''
     def __init__(self, format_str, *args, **kwargs):
         self._format_str = format_str
-        self.set_parser(self._format_str, dict(s=str))
+        self.set_parser(self._format_str, default_extra_types)
         super().__init__(*args, **kwargs)
+    # maximum number of partially evaluated format strings kept per parmatter
+    partial_maxsize = 64
     def format(self, *args, **kwargs):
-        '''ParmatterBase.format overridden to remove format_str from the signature.'''
-        return super().format(self._format_str, *args, **kwargs)
+        '''ParmatterBase.format overridden to remove format_str from the signature.
+        
+        For parmatters with a default_namespace, the fields that will use a default 
+        value are rendered once (see partial_format_str) and only the fields supplied 
+        by the caller are formatted.'''
+        try:
+            default_namespace = self.default_namespace
+        except AttributeError:
+            return super().format(self._format_str, *args, **kwargs)
+        format_str, has_fields = self.partial_format_str(default_namespace, len(args), kwargs)
+        if not has_fields:
+            return format_str
+        return super().format(format_str, *args, **kwargs)
+    def partial_format_str(self, default_namespace, nargs, kwargs):
+        '''The format_str with the fields that use a default value (for nargs positional 
+        arguments and the kwargs keys) pre-rendered into literal text, and whether any 
+        fields remain. The results are cached and invalidated when the default_namespace 
+        changes (mutating a default value in place is not detected); a DefaultNamespace is
+        checked by its version, other mappings are compared to a copy.'''
+        key = (nargs, frozenset(kwargs)) if kwargs else nargs
+        try:
+            namespace, version, partials = self._partials
+            if ((namespace is default_namespace and version == namespace.version)
+                or (version is None and namespace == default_namespace)):
+                return partials[key]
+        except (AttributeError, KeyError):
+            pass
+        result = self._partial_format_str(default_namespace, nargs, kwargs)
+        # cache misses are rare; a new (namespace, version, partials) tuple is built under the
+        # lock and swapped in, so readers (which don't take the lock) always see a consistent one
+        with _partials_lock:
+            try:
+                namespace, version, partials = self._partials
+                if not ((namespace is default_namespace and version == namespace.version)
+                        or (version is None and namespace == default_namespace)):
+                    raise AttributeError
+            except AttributeError:
+                try:
+                    namespace, version = default_namespace, default_namespace.version
+                except AttributeError:
+                    # other mappings are compared to a copy
+                    namespace, version = dict(default_namespace), None
+                partials = {}
+            partials = dict(partials) if len(partials) < self.partial_maxsize else {}
+            partials[key] = result
+            self._partials = namespace, version, partials
+            return result
+    def _partial_format_str(self, default_namespace, nargs, kwargs):
+        escape = lambda text: text.replace('{', '{{').replace('}', '}}')
+        pieces = []
+        # the unescaped text, used if no fields remain
+        texts = []
+        has_fields = False
+        auto_number = manual_number = False
+        auto_arg_index = 0
+        for literal, field_name, spec, conversion in self.parse(self._format_str):
+            pieces.append(escape(literal))
+            texts.append(literal)
+            if field_name is None:
+                continue
+            field = '{' + field_name + ('!'+conversion if conversion else '') + (':'+spec if spec else '') + '}'
+            # auto numbered fields are given explicit numbers
+            if field_name == '' or field_name[0] in '.[':
+                auto_number = True
+                field_name = str(auto_arg_index) + field_name
+                field = '{' + str(auto_arg_index) + field[1:]
+                auto_arg_index += 1
+            elif field_name[0].isdigit():
+                manual_number = True
+            first, _ = _string.formatter_field_name_split(field_name)
+            if isinstance(first, int):
+                supplied = first < nargs
+            else:
+                # attribute lookups of the positional arguments could supply the value
+                supplied = first in kwargs or (nargs and isinstance(self, AttrParmatter))
+            if supplied or first not in default_namespace or '{' in spec:
+                pieces.append(field)
+                has_fields = True
+                continue
+            try:
+                obj, _ = self.get_field(field_name, (), {})
+                text = self.format_field(self.convert_field(obj, conversion), spec)
+            except Exception:
+                # the error is raised when the field is formatted as usual
+                pieces.append(field)
+                has_fields = True
+            else:
+                pieces.append(escape(text))
+                texts.append(text)
+        if auto_number and manual_number:
+            # invalid; formatted (and the error raised) as usual
+            return self._format_str, True
+        if not has_fields:
+            return ''.join(texts), False
+        return ''.join(pieces), True
     def unformat(self, string):
         '''ParmatterBase.unformat overridden to use compiled parser.'''
         return self._parser.parse(string)
-    def set_parser(self, format_str, extra_types=dict(s=str)):
-        '''Sets a static parser for the parmatter.'''
-        self._parser = _parse.compile(format_str, extra_types)
+    def set_parser(self, format_str, extra_types=default_extra_types):
+        '''Sets a static parser for the parmatter. Registered custom spec types used by the
+        format_str are included (see registry.register_spec_type).'''
+        self._parser = compile_parser(format_str, spec_types.extra_types(format_str, extra_types))
 
 
 class FloatIntParmatter(StaticParmatter):
@@ -42,19 +165,13 @@ class FloatIntParmatter(StaticParmatter):
         spec_tup = parse_spec(spec, strict=False)
         spec = spec_tup._replace(type=spec_tup.type.replace('fd', 'f')).join()
         return super().format_field(value, spec)
-    # float or int regex
-    @staticmethod
-    @_parse.with_pattern(r'[+-]?((\.\d+)|(\d+\.\d*)|\d+)')
-    def _fd(s):
-        '''Method used by the parse module to populate re.Result
-        output for the fd formatting spec.
-        '''
-        return float(s)
-    def set_parser(self, format_str, extra_types=dict(s=str)):
+    # float or int converter (with its regex) from the spec type registry
+    _fd = staticmethod(spec_types['fd'])
+    def set_parser(self, format_str, extra_types=default_extra_types):
         '''Sets a static parser for the parmatter, including new fd spec.'''
-        if 'fd' not in extra_types:
-            extra_types.update(fd=FloatIntParmatter._fd)
-        self._parser = _parse.compile(format_str, extra_types)
+        extra_types = dict(extra_types)
+        extra_types.setdefault('fd', spec_types['fd'])
+        super().set_parser(format_str, extra_types)
 
 
 class BlankParmatter(StaticParmatter):
@@ -73,28 +190,8 @@ class BlankParmatter(StaticParmatter):
         >>> BlankParmatter().format('{:.1fblank}', 1.1)
         '1.1'
     '''
-    # regex for "all blank space"
-    blank_pattern = r'\s*'
-    # for initializing different format type codes, use a mapping to 
-    # associate a function decorated by with_pattern(blank_pattern);
-    # only used when "blank"
-    @staticmethod
-    def _blank_handler(f, pattern):
-        '''Handler factory for special spec types.'''
-        @_parse.with_pattern(pattern)
-        def _handler(s):
-            if s.split():
-                return f(s)
-            else:
-                return f()
-        return _handler
-    # to be replaced below:
-    def blank_type_to_func(handler_factory, pattern):
-        return {k:handler_factory(v, pattern) for k,v in 
-                            {'':str, 'fd':float, 's':str,
-                             'd':int, 'f':float, 'n':int}.items()}
-    # replacing function above:
-    blank_type_to_func = blank_type_to_func(_blank_handler.__func__, blank_pattern)
+    # initializers used for blank values (eg 0 for types such as int and float)
+    blank_initializers = {k:initializer for k,(initializer,_) in blank_bases.items()}
     def format_field(self, value, spec):
         '''Replace value with a Blank object when formatting is carried out. The
         Blank object type knows how to deal with the "blank" spec type. If the value
@@ -115,35 +212,32 @@ class BlankParmatter(StaticParmatter):
                     # for looking up blank_initializer
                     spec_type = spec_tup.type.replace('blank', '')
                     # replace value (eg 0 for types such as int and float)
-                    value = BlankParmatter.blank_type_to_func[spec_type]()
+                    value = BlankParmatter.blank_initializers[spec_type]()
             # falsey objects from make_blank will appear blank when formatted
             value = make_blank(value)
         return super().format_field(value, spec)
-    def set_parser(self, format_str, extra_types=dict(s=str)):
+    def set_parser(self, format_str, extra_types=default_extra_types):
         '''Add new blank spec suffixes to the parser's extra_types argument.'''
-        # Need to add a different blank spec handler for each of the different kinds of 
-        # format spec types (d, n, f, s, etc etc) in the format_str
-        # First parse the format_str into usable form (borrowing code from parse module)
+        # Need a different blank spec handler for each of the different kinds of 
+        # format spec types (d, n, f, s, etc etc) in the format_str; the handlers are
+        # built once by the spec type registry and shared by all parsers
         # note: '{{' and '}}' come in from parse_format_str as separate parts
         fields = (part for part in parse_format_str(format_str) 
                    if part and part[0] == '{' and part[-1] == '}')
-        # gather the non-blank spec types and add a handler for each
+        extra_types = dict(extra_types)
         for field in fields:
-            no_brackets = field[1:-1]
             try:
-                spec_tup = parse_spec(no_brackets.split(':', 1)[1], strict=False)
+                spec_tup = parse_spec(field[1:-1].split(':', 1)[1], strict=False)
             except IndexError:
                 raise ValueError('No format specification was provided for the parser.')
-            # get version of the spec without the word "blank"
-            spec_tup_new = spec_tup._replace(type=spec_tup.type.replace('blank', ''))
-            # get the correct with_pattern blank initializer for the spec type
+            if 'blank' not in spec_tup.type:
+                continue
+            # get the converter (decorated by with_pattern) for the spec type
             try:
-                blank_initializer = BlankParmatter.blank_type_to_func[spec_tup_new.type]
+                extra_types.setdefault(spec_tup.type, spec_types[spec_tup.type])
             except KeyError as err:
                 raise KeyError('The spec type {!r} does not have an associated initializer.'
                                ''.format(spec_tup.type)) from err
-            # pass the initializer (decorated by with_pattern) to the extra_types dict for the parser
-            extra_types.update({spec_tup.type: lambda s: blank_initializer(s)})
         # the original format_str is unaffected
         super().set_parser(format_str, extra_types)
 
@@ -209,7 +303,9 @@ class AttrParmatter(ParmatterBase):
         
 class PositionalDefaultParmatter(DefaultParmatter):
     '''A formatter with a default positional namespace.'''
-    def __init__(self, *values, default_namespace={}, **kwargs):
+    def __init__(self, *values, default_namespace=None, **kwargs):
+        # a copy; the caller's namespace is not mutated
+        default_namespace = DefaultNamespace(default_namespace or {})
         default_namespace.update({i:value for i,value in enumerate(values)})
         super().__init__(default_namespace, **kwargs)
     @staticmethod
@@ -236,5 +332,5 @@ class VersatileParmatter(StaticParmatter,PositionalDefaultParmatter,AttrParmatte
     '''A static formatter with a default positional namespace that looks in args object 
     attributes for values. The args are inspected in order. First one wins. 
     Callable attributes are ignored.'''
-    def __init__(self, format_str, *values, default_namespace={}, **kwargs):
+    def __init__(self, format_str, *values, default_namespace=None, **kwargs):
         super().__init__(format_str, *values, default_namespace=default_namespace, **kwargs)
\ No newline at end of file
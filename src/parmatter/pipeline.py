@@ -0,0 +1,139 @@
+'''A bounded producer/consumer pipeline around iunformat_lines, so reading a file overlaps with
+parsing it and with the downstream consumer:
+
+    reader thread -> line batches -> detection thread -> match batches -> converter threads
+
+The reader thread fills a bounded queue of line batches. The detection thread applies the
+line_rules in order, only matching each line (evaluate_result=False); the matched batches are
+converted (evaluated) by a pool of worker threads. Results are generated in file order, and at
+most max_batches batches wait in each queue, which caps memory and gives backpressure.
+
+Usage:
+
+    >>> for LineType, result in iunformat_pipeline_path('model.dat.gz', line_rules, workers=2):
+    ...     ...
+'''
+
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+import queue
+import threading
+from .streams import open_lines
+from .unformat_file import iunformat_lines
+
+# marks the end of a queue
+_done = object()
+
+
+class _Failed():
+    '''Carries an exception raised in a pipeline thread to the consumer.'''
+    def __init__(self, exc):
+        self.exc = exc
+
+
+def _put(q, item, stop):
+    '''Put an item in a bounded queue, giving up if the pipeline is stopped.'''
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+        except queue.Full:
+            continue
+        return True
+    return False
+
+
+def _read(lines, batch_size, line_batches, stop):
+    try:
+        lines = iter(lines)
+        while True:
+            batch = list(islice(lines, batch_size))
+            if not batch or not _put(line_batches, batch, stop):
+                break
+    except BaseException as exc:
+        _put(line_batches, _Failed(exc), stop)
+    else:
+        _put(line_batches, _done, stop)
+
+
+def _queued_lines(line_batches, stop):
+    '''The lines of the queued batches.'''
+    while not stop.is_set():
+        batch = line_batches.get()
+        if batch is _done:
+            return
+        if isinstance(batch, _Failed):
+            raise batch.exc
+        yield from batch
+
+
+def _evaluate(batch):
+    '''Convert a batch of (LineType, parse.Match) pairs to (LineType, parse.Result) pairs.'''
+    return [(LineType, match if LineType is None else LineType.evaluate(match)) for LineType, match in batch]
+
+
+def _detect(line_batches, line_rules, batch_size, executor, result_batches, stop):
+    batch = []
+    try:
+        for item in iunformat_lines(_queued_lines(line_batches, stop), line_rules, evaluate_result=False):
+            batch.append(item)
+            if len(batch) >= batch_size:
+                if not _put(result_batches, executor.submit(_evaluate, batch), stop):
+                    return
+                batch = []
+    except BaseException as exc:
+        # the lines before the failure are still generated
+        if not batch or _put(result_batches, executor.submit(_evaluate, batch), stop):
+            _put(result_batches, _Failed(exc), stop)
+    else:
+        if not batch or _put(result_batches, executor.submit(_evaluate, batch), stop):
+            _put(result_batches, _done, stop)
+
+
+def iunformat_pipeline(lines, line_rules, batch_size=10000, max_batches=4, workers=2):
+    '''Generates the LineType and LineType.unformat result for each line of a file, like
+    iunformat_lines, using the reader/detection/converter pipeline.
+    batch_size: number of lines per batch
+    max_batches: maximum number of batches waiting in each queue
+    workers: number of converter threads
+    raises TypeError if an invalid line sequence is encountered (after the preceding lines
+    have been generated)'''
+    line_batches = queue.Queue(max_batches)
+    result_batches = queue.Queue(max_batches)
+    stop = threading.Event()
+    with ThreadPoolExecutor(workers, thread_name_prefix='parmatter-convert') as executor:
+        threads = [threading.Thread(target=_read, args=(lines, batch_size, line_batches, stop), daemon=True),
+                   threading.Thread(target=_detect, args=(line_batches, line_rules, batch_size, executor, result_batches, stop), daemon=True)]
+        for thread in threads:
+            thread.start()
+        try:
+            while True:
+                item = result_batches.get()
+                if item is _done:
+                    break
+                if isinstance(item, _Failed):
+                    raise item.exc
+                yield from item.result()
+        finally:
+            # stop the threads (e.g. if the consumer stops early)
+            stop.set()
+            for q in (line_batches, result_batches):
+                while True:
+                    try:
+                        q.get_nowait()
+                    except queue.Empty:
+                        break
+            # unblock a detection thread waiting for lines
+            try:
+                line_batches.put_nowait(_done)
+            except queue.Full:
+                pass
+            for thread in threads:
+                thread.join()
+
+
+def iunformat_pipeline_path(path, line_rules, encoding=None, **kwargs):
+    '''iunformat_pipeline for a plain or compressed (gzip, xz, bz2) file; the file is read by
+    the reader thread. Keyword arguments are passed to iunformat_pipeline.'''
+    with open_lines(path, encoding=encoding) as f:
+        # parse patterns must match the line exactly, so line endings are removed
+        yield from iunformat_pipeline((line.rstrip('\n') for line in f), line_rules, **kwargs)
@@ -0,0 +1,168 @@
+'''Process-wide registries of compiled parsers and custom spec types. Parmatters and format 
+groups that share identical format strings and extra types also share a single compiled
+``parse.Parser``; the converters for custom spec types (e.g. "fd" and "dblank") are built once.
+
+Example usage:
+
+    >>> p = compile_parser('{: >5d}', dict(s=str))
+    >>> p is compile_parser('{: >5d}', dict(s=str))
+    True
+    >>> parser_registry.info()
+    RegistryInfo(hits=1, misses=1, evictions=0, maxsize=1024, currsize=1)
+'''
+
+from collections import OrderedDict as od, namedtuple as nt
+import threading
+import parse as _parse # avoid name conflicts with parse methods
+from .minilang import field_spec_strs, parse_spec
+
+RegistryInfo = nt('RegistryInfo', 'hits misses evictions maxsize currsize')
+
+
+class ParserRegistry():
+    '''A size-bounded (least recently used) registry of compiled parsers, deduplicated
+    by format string and extra types. A maxsize of None means unbounded. Safe to use
+    from multiple threads.'''
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self.clear()
+    @staticmethod
+    def fingerprint(format_str, extra_types):
+        '''The registry key for a format string and extra types dict. The converters
+        themselves (not their ids) are part of the key so they cannot be recycled.'''
+        return format_str, frozenset((extra_types or {}).items())
+    def compile(self, format_str, extra_types=None):
+        '''Return the registered parser for the format string and extra types, compiling
+        and registering a new one if needed.'''
+        try:
+            key = self.fingerprint(format_str, extra_types)
+            hash(key)
+        except TypeError:
+            # unhashable extra types; can't be shared
+            with self._lock:
+                self._misses += 1
+            return _parse.compile(format_str, dict(extra_types))
+        with self._lock:
+            try:
+                parser = self._parsers[key]
+            except KeyError:
+                pass
+            else:
+                self._hits += 1
+                self._parsers.move_to_end(key)
+                return parser
+        # compiled outside the lock; a copy protects the registered parser from changes to 
+        # the caller's dict
+        parser = _parse.compile(format_str, dict(extra_types or {}))
+        with self._lock:
+            self._misses += 1
+            # another thread may have registered the same parser meanwhile
+            parser = self._parsers.setdefault(key, parser)
+            self._parsers.move_to_end(key)
+            if self.maxsize is not None and len(self._parsers) > self.maxsize:
+                self._parsers.popitem(last=False)
+                self._evictions += 1
+        return parser
+    def info(self):
+        '''Reuse statistics for the registry.'''
+        return RegistryInfo(self._hits, self._misses, self._evictions, self.maxsize, len(self._parsers))
+    def clear(self):
+        '''Remove all registered parsers and reset the statistics.'''
+        with self._lock:
+            self._parsers = od()
+            self._hits = self._misses = self._evictions = 0
+    def __len__(self):
+        return len(self._parsers)
+
+
+parser_registry = ParserRegistry()
+
+def compile_parser(format_str, extra_types=None):
+    '''Get a shared compiled parser from the process-wide registry.'''
+    return parser_registry.compile(format_str, extra_types)
+
+
+# regex patterns used for the custom spec types (non-capturing so parse group counts hold)
+int_pattern = r'[-+ ]?\d+'
+float_pattern = r'[-+ ]?(?:\d+\.?\d*(?:[eE][-+]?\d+)?|\.\d+(?:[eE][-+]?\d+)?|nan|inf)'
+float_int_pattern = r'[+-]?(?:\.\d+|\d+\.\d*|\d+)'
+str_pattern = r'.+?'
+blank_pattern = r'(?:(?:{})|\s*)'
+
+# initializers and patterns for the spec types that can have the "blank" suffix
+blank_bases = {'':(str, str_pattern), 's':(str, str_pattern), 'd':(int, int_pattern),
+               'n':(int, int_pattern), 'f':(float, float_pattern), 'fd':(float, float_int_pattern)}
+
+
+@_parse.with_pattern(float_int_pattern)
+def float_int(s):
+    '''Converter for the "fd" spec: a float value that could also be read as an int.'''
+    return float(s)
+
+
+def blank_converter(initializer, pattern):
+    '''Converter for a "<type>blank" spec: a value that could also be read as whitespace, 
+    in which case the initializer default (e.g. 0 for int) is used.'''
+    @_parse.with_pattern(blank_pattern.format(pattern))
+    def _blank(s):
+        if s.split():
+            return initializer(s)
+        else:
+            return initializer()
+    return _blank
+
+
+class SpecTypeRegistry():
+    '''A registry of custom spec types for the parse module, including "fd" and every 
+    "<type>blank" combination. Each type's converter and regex pattern are built once and 
+    attached to parsers by reference. Safe to use from multiple threads.'''
+    def __init__(self):
+        self._types = {}
+        self._lock = threading.Lock()
+    def register(self, name, converter, pattern=None):
+        '''Register a custom spec type. The pattern is attached to the converter (as with 
+        parse.with_pattern) if provided.'''
+        if pattern is not None:
+            converter = _parse.with_pattern(pattern)(converter)
+        with self._lock:
+            self._types[name] = converter
+        return converter
+    def __getitem__(self, name):
+        try:
+            return self._types[name]
+        except KeyError:
+            # blank types are built on first use
+            base = name[:-len('blank')] if name.endswith('blank') else None
+            if base not in blank_bases:
+                raise KeyError(name) from None
+            with self._lock:
+                # only one converter is ever built for each type
+                return self._types.setdefault(name, blank_converter(*blank_bases[base]))
+    def __contains__(self, name):
+        try:
+            self[name]
+        except KeyError:
+            return False
+        return True
+    def extra_types(self, format_str, extra_types=None):
+        '''A new extra_types dict including the registered types used by the fields of the 
+        format string (types already in extra_types are not replaced).'''
+        extra_types = dict(extra_types or {})
+        for spec in field_spec_strs(format_str):
+            try:
+                spec_type = parse_spec(spec, strict=False).type
+            except ValueError:
+                # not a custom type (e.g. '5.1%' or the datetime spec '%Y-%m-%d')
+                continue
+            if spec_type and spec_type not in extra_types and spec_type in self:
+                extra_types[spec_type] = self[spec_type]
+        return extra_types
+
+
+spec_types = SpecTypeRegistry()
+spec_types.register('fd', float_int)
+
+def register_spec_type(name, converter, pattern=None):
+    '''Register a custom spec type with the process-wide registry.'''
+    return spec_types.register(name, converter, pattern)
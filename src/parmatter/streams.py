@@ -0,0 +1,51 @@
+'''Opening plain and compressed (gzip, xz, bz2) files as streams of text lines. Compression
+is detected from the leading bytes of the file when reading, and from the path suffix when
+writing. Decoding and encoding are done in large chunks, so no temporary files are needed.'''
+
+import bz2
+import gzip
+import io
+import lzma
+import pathlib
+
+# size of the chunks read from or written to the (compressed) file
+chunk_size = 1 << 20
+
+# leading bytes of compressed files
+compression_magic = ((b'\x1f\x8b', gzip.open),
+                     (b'\xfd7zXZ\x00', lzma.open),
+                     (b'BZh', bz2.open),
+                     )
+
+compression_suffixes = {'.gz':gzip.open, '.xz':lzma.open, '.lzma':lzma.open, '.bz2':bz2.open}
+
+
+def detect_compression(path):
+    '''The opener (gzip.open, lzma.open, bz2.open) for a compressed file, or None.'''
+    with open(path, 'rb') as f:
+        head = f.read(6)
+    for magic, opener in compression_magic:
+        if head.startswith(magic):
+            return opener
+    return None
+
+
+def open_lines(path, mode='r', encoding=None, errors=None, newline=None):
+    '''Open a plain or compressed file in text mode ('r', 'w', 'a', or 'x').
+
+    Compression is detected from the file contents when reading and from the path suffix
+    otherwise.'''
+    if mode not in ('r', 'w', 'a', 'x'):
+        raise ValueError('Invalid mode: {!r}.'.format(mode))
+    if mode == 'r':
+        opener = detect_compression(path)
+    else:
+        opener = compression_suffixes.get(pathlib.Path(path).suffix.lower())
+    if opener is None:
+        return open(path, mode, buffering=chunk_size, encoding=encoding, errors=errors, newline=newline)
+    raw = opener(path, mode+'b')
+    if mode == 'r':
+        buffered = io.BufferedReader(raw, buffer_size=chunk_size)
+    else:
+        buffered = io.BufferedWriter(raw, buffer_size=chunk_size)
+    return io.TextIOWrapper(buffered, encoding=encoding, errors=errors, newline=newline)
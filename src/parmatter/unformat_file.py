@@ -1,40 +1,282 @@
 from collections import namedtuple as nt
+from array import array
+from itertools import islice
+from .minilang import field_specs, spec_value_type
+from .streams import open_lines
+from .interning import CategoryTable
+from .key_index import KeyIndexes
 
 UnformatFile = nt('UnformatFile', 'struct result')
+UnformatKeyed = nt('UnformatKeyed', 'struct result keys')
+UnformatColumns = nt('UnformatColumns', 'types index columns')
+
+# array typecodes used for numeric member columns
+column_typecodes = {int:'q', float:'d'}
+
+
+class IncompleteBlockError(TypeError):
+    '''Raised when fewer lines follow than a declared repeat count requires.'''
+    def __init__(self, msg, line_number):
+        super().__init__(msg)
+        self.line_number = line_number
+
+
+# number of counted block lines sliced off and decoded together (bounds the memory used)
+block_batch_size = 10000
+
+
+def iunformat_lines(lines, line_rules, evaluate_result=True, prev_type=None, first_line=1):
+    '''Generates the LineType and LineType.unformat result for each line of a file
+    line_rules: defines valid LineType succession (see unformat_lines)
+    evaluate_result: if False, parse.Match objects are produced (lines declaring a repeat
+        count are always evaluated)
+    prev_type, first_line: LineType preceding and number of the first line (for resuming)
+    blank lines produce (None, None)
+    raises TypeError if an invalid line sequence or repeat count (e.g. negative) is encountered
+    
+    When the LineType of a line declares a repeat count (see FormatGroupMeta), the counted 
+    lines that follow are decoded as a block without consulting line_rules.'''
+    PrevType = prev_type
+    # the line declaring the count of the preceding block, if the previous line ended one
+    block_line = None
+    numbered_lines = enumerate(lines, first_line)
+    for i, line in numbered_lines:
+        # skip blank lines
+        if line.strip():
+            try:
+                line_types = line_rules[PrevType]
+            except KeyError:
+                line_types = ()
+            for LineType in line_types:
+                unformat = LineType.unformat(line, evaluate_result)
+                if unformat is not None:
+                    break
+            else:
+                # format not matched
+                msg = 'Failed to read at line #{:d}: {!r}'.format(i, line)
+                if block_line is not None:
+                    msg += ('; it follows the {} lines counted at line #{:d} (is the count too small?)'
+                            ''.format(PrevType.__name__, block_line))
+                elif PrevType not in line_rules:
+                    msg += '; no line_rules entry for {}'.format(getattr(PrevType, '__name__', PrevType))
+                raise TypeError(msg)
+            PrevType = LineType
+            block_line = None
+            yield LineType, unformat
+            try:
+                count_member, BlockType = LineType._count
+            except AttributeError:
+                continue
+            if not evaluate_result:
+                unformat = LineType.unformat(line)
+            count = getattr(unformat.fixed, count_member)
+            if not isinstance(count, int) or count < 0:
+                raise TypeError('Line #{:d} declares an invalid count of {} lines: {!r}'
+                                ''.format(i, BlockType.__name__, count))
+            if count:
+                yield from unformat_block(numbered_lines, BlockType, count, i, evaluate_result)
+                PrevType = BlockType
+                block_line = i
+        else:
+            PrevType = None
+            block_line = None
+            yield None, None
+
+
+def unformat_block(numbered_lines, BlockType, count, line_number, evaluate_result=True, batch_size=None):
+    '''Generates (BlockType, BlockType.unformat result) for the next count lines; these 
+    are sliced off and decoded together, in batches of batch_size lines (block_batch_size
+    by default), with no LineType dispatch.
+    numbered_lines: iterator of (line number, line) pairs
+    line_number: number of the line that declared the count
+    raises TypeError if a line doesn't match (IncompleteBlockError if there are fewer than 
+    count lines); the lines of the preceding batches have been generated'''
+    batch_size = batch_size or block_batch_size
+    unformat = BlockType.unformat
+    done = 0
+    while done < count:
+        block = list(islice(numbered_lines, min(batch_size, count-done)))
+        if len(block) < min(batch_size, count-done):
+            raise IncompleteBlockError('Line #{:d} declares {:d} {} lines but only {:d} follow.'
+                            ''.format(line_number, count, BlockType.__name__, done+len(block)), line_number)
+        results = [unformat(line, evaluate_result) for _, line in block]
+        for k, ((i, line), result) in enumerate(zip(block, results), done+1):
+            if result is None:
+                raise TypeError('Failed to read {} line {:d} of {:d} (declared at line #{:d}) at '
+                                'line #{:d}: {!r}'.format(BlockType.__name__, k, count, line_number, i, line))
+        done += len(block)
+        for result in results:
+            yield BlockType, result
+
+
+def iunformat_select(lines, line_rules, select=None, where=None):
+    '''Generates the LineType and unformat result for the lines of a file, with projection and
+    predicate pushdown. Each line is only matched to detect its LineType (see iunformat_lines).
+    select: optional {LineType: member names} mapping; only the named members are converted
+        (None for all members). Lines of other LineTypes, and blank lines, are skipped.
+    where: optional {LineType: predicate} mapping; a line is skipped unless the predicate
+        returns True for the raw text of its fields (see FormatGroupMeta.raw_fields)
+    raises TypeError if an invalid line sequence is encountered'''
+    converters = {}
+    for LineType, match in iunformat_lines(lines, line_rules, evaluate_result=False):
+        if LineType is None:
+            if select is None:
+                yield None, None
+            continue
+        try:
+            convert = converters[LineType]
+        except KeyError:
+            if select is not None and LineType not in select:
+                convert = None
+            elif select is None or select[LineType] is None:
+                convert = LineType.evaluate
+            else:
+                convert = LineType.projection(select[LineType])
+            converters[LineType] = convert
+        if convert is None:
+            continue
+        if where is not None:
+            predicate = where.get(LineType)
+            if predicate is not None and not predicate(LineType.raw_fields(match)):
+                continue
+        yield LineType, convert(match)
+
+
+def line_types(line_rules):
+    '''The {name: LineType} mapping of the LineTypes in line_rules, including the LineTypes of
+    counted blocks. Raises ValueError if two LineTypes have the same name.'''
+    types = {}
+    pending = [LineType for PrevType, LineTypes in line_rules.items() for LineType in (PrevType, *LineTypes)]
+    while pending:
+        LineType = pending.pop()
+        if LineType is None or types.get(LineType.__name__) is LineType:
+            continue
+        if LineType.__name__ in types:
+            raise ValueError('More than one LineType is named {!r}.'.format(LineType.__name__))
+        types[LineType.__name__] = LineType
+        try:
+            pending.append(LineType._count[1])
+        except AttributeError:
+            pass
+    return types
+
+
+def with_key_members(select):
+    '''A copy of a select mapping (see iunformat_select) with the key member of each LineType
+    (see the key_index module) added to its selected members.'''
+    select = dict(select)
+    for LineType, members in select.items():
+        key = getattr(LineType, '_key', None)
+        if members is not None and key is not None and key not in members:
+            select[LineType] = (*members, key)
+    return select
 
 
 # NOTE: relocated unformat_file to msh.py module
-def unformat_lines(lines, line_rules):
+def unformat_lines(lines, line_rules, columnar=False, keyed=False, select=None, where=None):
     '''Builds the LineType sequence and LineType.unformat result for a file
     line_rules: defines valid LineType succession. a dict of the form:
         parse.compile obj: (parse.compile obj, parse.compile obj, ...)
         use None for the first line
+    columnar: if True, an UnformatColumns is returned instead (see unformat_columns)
+    keyed: if True, an UnformatKeyed is returned instead; its keys are the KeyIndexes of 
+        the LineTypes with a key member (see the key_index module)
+    select, where: projection and predicate pushdown; only the selected LineTypes and members
+        of the lines passing the predicates are converted and kept (see iunformat_select);
+        when keyed, the key members are always kept
     raises TypeError if an invalid line sequence is encountered'''
+    if keyed and select is not None:
+        select = with_key_members(select)
+    if columnar:
+        return unformat_columns(lines, line_rules, select, where)
     file_struct = []
     file_items = []
+    keys = KeyIndexes() if keyed else None
 
-    for i, line in enumerate(lines):
-        # skip blank lines
-        if line.strip():
-            try:
-                PrevType = file_struct[-1]
-            except IndexError:
-                # first line
-                PrevType = None
-            for LineType in line_rules[PrevType]:
-                unformat = LineType.unformat(line)
-                if unformat is None:
-                    # format not matched
-                    continue
-                else:
-                    file_items.append(unformat)
-                    file_struct.append(LineType)
-                    break
-                raise TypeError('Failed to read at '
-                                'line #{:d}: {!r}'.format(i+1, line))
-        else:
-            file_items.append(None)
-            file_struct.append(None)
+    if select is None and where is None:
+        items = iunformat_lines(lines, line_rules)
+    else:
+        items = iunformat_select(lines, line_rules, select, where)
+    for position, (LineType, unformat) in enumerate(items):
+        file_struct.append(LineType)
+        file_items.append(unformat)
+        if keyed:
+            keys.add(LineType, unformat, position)
 
     assert len(file_struct) == len(file_items)
+    if keyed:
+        return UnformatKeyed(file_struct, file_items, keys)
     return UnformatFile(file_struct, file_items)
+
+
+def unformat_path(path, line_rules, encoding=None, **kwargs):
+    '''unformat_lines for a plain or compressed (gzip, xz, bz2) file. The file is decoded in
+    large chunks straight into the parser. Keyword arguments are passed to unformat_lines.'''
+    with open_lines(path, encoding=encoding) as f:
+        # parse patterns must match the line exactly, so line endings are removed
+        return unformat_lines((line.rstrip('\n') for line in f), line_rules, **kwargs)
+
+
+def member_column(member, table=None):
+    '''Returns an empty column for the values of a format group member: a typed array
+    for members with a single int or float field or with category codes, otherwise a list.'''
+    if isinstance(table, CategoryTable):
+        return array(column_typecodes[int])
+    try:
+        specs = list(field_specs(member._format_str))
+    except ValueError:
+        # e.g. a datetime spec ('%Y-%m-%d')
+        specs = []
+    if len(specs) == 1:
+        try:
+            return array(column_typecodes[spec_value_type(specs[0].type)])
+        except KeyError:
+            pass
+    return []
+
+
+def unformat_columns(lines, line_rules, select=None, where=None):
+    '''Builds a struct-of-arrays version of the unformat_lines output (no NumPy required).
+
+    Returns an UnformatColumns of the form:
+        types: list of the LineTypes encountered (None for blank lines)
+        index: array of indexes into types; one per line, in file order
+        columns: dict of the form {LineType: {member name: column}}
+
+    Columns of single int or float fields are array.array ('q' or 'd'); all others are lists.
+    With select or where, only the selected columns and lines are kept (see iunformat_select).'''
+    if select is None and where is None:
+        items = iunformat_lines(lines, line_rules)
+    else:
+        items = iunformat_select(lines, line_rules, select, where)
+    return columns_from_items(items, select)
+
+
+def columns_from_items(items, select=None):
+    '''Builds an UnformatColumns (see unformat_columns) from (LineType, LineType.unformat 
+    result) pairs, e.g. from iunformat_lines or iunformat_parallel.
+    select: optional {LineType: member names} mapping of the columns of the results'''
+    types = []
+    type_codes = {}
+    index = array('B')
+    columns = {}
+
+    for LineType, unformat in items:
+        try:
+            code = type_codes[LineType]
+        except KeyError:
+            code = type_codes[LineType] = len(types)
+            types.append(LineType)
+            if LineType is not None:
+                names = (select or {}).get(LineType) or LineType._formatters
+                columns[LineType] = {name:member_column(LineType._formatters[name], LineType._intern_tables.get(name))
+                                     for name in names}
+            # widen the index when there are too many types for a byte
+            if code == 256:
+                index = array('H', index)
+        index.append(code)
+        if unformat is not None:
+            for column, value in zip(columns[LineType].values(), unformat.fixed):
+                column.append(value)
+
+    return UnformatColumns(types, index, columns)
@@ -0,0 +1,90 @@
+'''Structural validation of files against line_rules without converting or keeping any field
+values. Each line is only matched against the compiled regex of its candidate LineTypes, and
+every failing line is reported (rather than stopping at the first one):
+
+    >>> for error in ivalidate_lines(lines, line_rules):
+    ...     print(error.line_number, error.reason, error.candidates)
+
+After a failing line, the next line is checked against every LineType in line_rules so the
+validation can continue. Blank lines reset the line_rules state, as for iunformat_lines.'''
+
+from collections import namedtuple as nt
+from itertools import islice
+from .streams import open_lines
+
+LineError = nt('LineError', 'line_number line candidates reason')
+
+# LineType state after a failing line
+_unknown = object()
+
+
+def line_matcher(LineType):
+    '''The regex match function for the lines of a LineType (the line prefix is skipped).'''
+    match = LineType.parser()._match_re.match
+    n = len(LineType._prefix)
+    if n:
+        return lambda line: match(line[n:])
+    return match
+
+
+def ivalidate_lines(lines, line_rules, first_line=1):
+    '''Generates a LineError for each line that is invalid under line_rules (see
+    unformat_lines). The candidates are the LineTypes that were tried. Lines declaring a
+    repeat count are evaluated to read the count; all other lines are only matched.'''
+    matchers = {}
+    def matcher(LineType):
+        try:
+            return matchers[LineType]
+        except KeyError:
+            match = matchers[LineType] = line_matcher(LineType)
+            return match
+    every_type = tuple(dict.fromkeys(LineType for types in line_rules.values() for LineType in types))
+    PrevType = None
+    numbered_lines = enumerate(lines, first_line)
+    for i, line in numbered_lines:
+        # skip blank lines
+        if not line.strip():
+            PrevType = None
+            continue
+        candidates = every_type if PrevType is _unknown else line_rules.get(PrevType, ())
+        for LineType in candidates:
+            if matcher(LineType)(line) is not None:
+                break
+        else:
+            yield LineError(i, line, tuple(candidates), 'format not matched')
+            PrevType = _unknown
+            continue
+        PrevType = LineType
+        try:
+            count_member, BlockType = LineType._count
+        except AttributeError:
+            continue
+        count = getattr(LineType.unformat(line).fixed, count_member)
+        if not isinstance(count, int) or count < 0:
+            yield LineError(i, line, (LineType,), 'declares an invalid count of {} lines: {!r}'
+                                                  ''.format(BlockType.__name__, count))
+            continue
+        if not count:
+            continue
+        match = matcher(BlockType)
+        read = 0
+        for read, (j, block_line) in enumerate(islice(numbered_lines, count), 1):
+            if match(block_line) is None:
+                yield LineError(j, block_line, (BlockType,), 'format not matched')
+        if read < count:
+            yield LineError(i, line, (LineType,), 'declares {:d} {} lines but only {:d} follow'
+                                                  ''.format(count, BlockType.__name__, read))
+        PrevType = BlockType
+
+
+def validate_lines(lines, line_rules, max_errors=None):
+    '''A list of the LineErrors for the lines (empty if the lines are valid). Validation stops
+    after max_errors errors (never if None).'''
+    return list(islice(ivalidate_lines(lines, line_rules), max_errors))
+
+
+def validate_path(path, line_rules, encoding=None, max_errors=None):
+    '''validate_lines for a plain or compressed (gzip, xz, bz2) file.'''
+    with open_lines(path, encoding=encoding) as f:
+        # parse patterns must match the line exactly, so line endings are removed
+        return validate_lines((line.rstrip('\n') for line in f), line_rules, max_errors)
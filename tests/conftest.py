@@ -0,0 +1,18 @@
+from parmatter import FormatGroup
+import pytest
+
+@pytest.fixture
+def NodeCount():
+    return FormatGroup('NodeCount', Total = '{: >5d}')
+
+@pytest.fixture
+def NodeLine():
+    return FormatGroup('NodeLine', Num = '{: >5d}', X = ('{: >10f}', 0), Y = ('{: >10f}', 0))
+
+@pytest.fixture
+def CountedNodes(NodeLine):
+    return FormatGroup('CountedNodes', Total = '{: >5d}', count = ('Total', NodeLine))
+
+@pytest.fixture
+def line_rules(NodeCount, NodeLine):
+    return {None:(NodeCount,), NodeCount:(NodeLine,), NodeLine:(NodeLine,)}
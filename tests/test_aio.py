@@ -0,0 +1,52 @@
+from parmatter import unformat_path
+from parmatter.aio import AsyncLimits, aiter_unformat_path, unformat_many, format_many
+import asyncio
+import io
+import pytest
+
+@pytest.fixture
+def line_rules(NodeLine):
+    return {None:(NodeLine,), NodeLine:(NodeLine,)}
+
+@pytest.fixture
+def limits():
+    limits = AsyncLimits(max_workers=2, max_open_files=2)
+    yield limits
+    limits.shutdown()
+
+@pytest.fixture
+def paths(tmp_path, NodeLine):
+    paths = [str(tmp_path/'deck{}.txt.gz'.format(k)) for k in range(5)]
+    limits = AsyncLimits(1)
+    for k, path in enumerate(paths):
+        asyncio.run(format_many(NodeLine, [(i, i*k) for i in range(25)], path, limits=limits, shard_size=10))
+    limits.shutdown()
+    return paths
+
+def test_aiter_unformat_path(paths, line_rules, NodeLine, limits):
+    async def read():
+        return [item async for item in aiter_unformat_path(paths[2], line_rules, chunk_lines=7, limits=limits)]
+    items = asyncio.run(read())
+    assert len(items) == 25
+    assert items[-1][0] is NodeLine
+    assert items[-1][1].fixed == (24, 48.0, 0.0)
+
+def test_unformat_many(paths, line_rules, limits):
+    results = asyncio.run(unformat_many(paths, line_rules, limits=limits))
+    assert [result.result[1].fixed.X for result in results] == [0.0, 1.0, 2.0, 3.0, 4.0]
+    assert [r.fixed for r in results[3].result] == [r.fixed for r in unformat_path(paths[3], line_rules).result]
+
+def test_limits_reused_by_event_loops(paths, line_rules):
+    limits = AsyncLimits(max_workers=2, max_open_files=1)
+    for _ in range(2):
+        results = asyncio.run(unformat_many(paths[:3], line_rules, limits=limits))
+        assert len(results) == 3
+    limits.shutdown()
+
+def test_format_many_async_records(NodeLine, limits):
+    async def records():
+        for i in range(3):
+            yield i, i/2
+    f = io.StringIO()
+    asyncio.run(format_many(NodeLine, records(), f, limits=limits, shard_size=2))
+    assert f.getvalue() == ''.join(NodeLine.format(i, i/2)+'\n' for i in range(3))
@@ -0,0 +1,63 @@
+from parmatter import FormatGroup, unformat_lines
+import pytest
+
+pa = pytest.importorskip('pyarrow')
+from parmatter.arrow import arrow_schema, iunformat_batches, export_lines, export_path
+
+@pytest.fixture
+def Header():
+    return FormatGroup('Header', Title = '{: >8s}', Count = '{: >5d}', intern = dict())
+
+@pytest.fixture
+def NodeLine():
+    return FormatGroup('NodeLine', Num = '{: >5d}', X = ('{: >10.3f}', 0), XY = '{: >10.3f}{: >10.3f}')
+
+@pytest.fixture
+def line_rules(Header, NodeLine):
+    return {None:(Header,), Header:(NodeLine,), NodeLine:(NodeLine,)}
+
+@pytest.fixture
+def lines():
+    return ['   nodes    3'] + ['{: >5d}{: >10.3f}{: >10.3f}{: >10.3f}'.format(i, i/2, i, -i) for i in range(1, 4)]
+
+def test_arrow_schema(Header):
+    schema = arrow_schema(Header)
+    assert schema.field('Title').type == pa.string()
+    assert schema.field('Count').type == pa.int64()
+
+def test_iunformat_batches(lines, line_rules, Header, NodeLine):
+    batches = list(iunformat_batches(lines, line_rules, batch_size=2))
+    assert [(LineType, batch.num_rows) for LineType, batch in batches] == [(NodeLine, 2), (Header, 1), (NodeLine, 1)]
+    nodes = pa.Table.from_batches([batch for LineType, batch in batches if LineType is NodeLine])
+    assert nodes.column('Num').to_pylist() == [1, 2, 3]
+    assert nodes.column('XY').to_pylist()[-1] == [3.0, -3.0]
+    assert nodes.schema.field('XY').type == pa.list_(pa.float64())
+
+def test_iunformat_batches_dates():
+    Event = FormatGroup('Event', Time = '{:ti}', Day = '{:%Y-%m-%d}', Tag = '{:>4s}', sep = ' ')
+    lines = ['2024-01-02T03:04:05 2024-05-06    a']
+    schema = arrow_schema(Event)
+    assert [field.type for field in schema] == [pa.string()]*3
+    (LineType, batch), = iunformat_batches(lines, {None:(Event,)})
+    assert batch.column('Tag').to_pylist() == ['a']
+    values = unformat_lines(lines, {None:(Event,)}).result[0].fixed
+    assert batch.column('Time').to_pylist() == [str(values.Time)]
+    assert batch.column('Day').to_pylist() == [str(values.Day)]
+
+@pytest.mark.parametrize('format', ['parquet', 'ipc'])
+def test_export_path(tmp_path, lines, line_rules, Header, NodeLine, format):
+    path = tmp_path/'deck.txt'
+    path.write_text('\n'.join(lines)+'\n')
+    paths = export_path(str(path), line_rules, str(tmp_path/'tables'), format=format, batch_size=2)
+    assert set(paths) == {Header, NodeLine}
+    if format == 'parquet':
+        import pyarrow.parquet as pq
+        table = pq.read_table(paths[NodeLine])
+    else:
+        table = pa.ipc.open_file(paths[NodeLine]).read_all()
+    assert table.num_rows == 3
+    assert table.column('X').to_pylist() == [0.5, 1.0, 1.5]
+
+def test_export_format_error(tmp_path, lines, line_rules):
+    with pytest.raises(ValueError):
+        export_lines(lines, line_rules, str(tmp_path), format='csv')
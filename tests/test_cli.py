@@ -0,0 +1,85 @@
+from parmatter.cli import main, load_schema, path_format
+import pytest
+
+schema = '''
+from parmatter import FormatGroup
+from parmatter.interning import CategoryTable
+
+Elem = FormatGroup('Elem', Num = '{: >5d}', Nodes = '{: >5d}{: >5d}', Kind = '{: >5s}', intern = dict(Kind=CategoryTable()))
+NodeCount = FormatGroup('NodeCount', Total = '{: >5d}', count = ('Total', Elem))
+NodeLine = FormatGroup('NodeLine', Num = '{: >5d}', X = ('{: >10.3f}', 0), Name = '{: >6s}')
+line_rules = {None:(NodeCount,), NodeCount:(NodeCount,), Elem:(NodeLine,), NodeLine:(NodeLine,)}
+'''
+
+@pytest.fixture
+def schema_path(tmp_path):
+    path = tmp_path/'schema.py'
+    path.write_text(schema)
+    return str(path)
+
+@pytest.fixture
+def deck(tmp_path):
+    lines = ['    2', '    1    1    2  tri', '    2    2    3 quad']
+    lines += ['{: >5d}{: >10.3f}{: >6s}'.format(i, i/4, 'n{}'.format(i%3)) for i in range(50)]
+    lines += ['', '    0']
+    path = tmp_path/'deck.txt'
+    path.write_text('\n'.join(lines)+'\n')
+    return path
+
+def test_load_schema(schema_path):
+    line_rules, types = load_schema(schema_path)
+    assert sorted(types) == ['Elem', 'NodeCount', 'NodeLine']
+    with pytest.raises(ValueError):
+        load_schema(schema_path, rules='missing')
+
+def test_path_format():
+    assert path_format('out.npz') == 'npz'
+    assert path_format('out.jsonl.gz') == 'jsonl'
+    assert path_format('out_dir') == 'csv'
+
+@pytest.mark.parametrize('output, options', [
+    ('out.jsonl', []),
+    ('out.jsonl.gz', ['--stream']),
+    ('out_csv', []),
+    ('out_csv', ['--stream', '--workers', '2', '--chunk-size', '7']),
+    ('out.npz', ['--workers', '3', '--chunk-size', '5']),
+])
+def test_round_trip(tmp_path, schema_path, deck, output, options):
+    if output.endswith('.npz'):
+        pytest.importorskip('numpy')
+    output = str(tmp_path/output)
+    assert main(['unformat', schema_path, str(deck), output] + options) == 0
+    formatted = tmp_path/'formatted.txt'
+    assert main(['format', schema_path, output, str(formatted), '--workers', '2', '--chunk-size', '4']) == 0
+    assert formatted.read_text() == deck.read_text()
+
+def test_csv_output(tmp_path, schema_path, deck):
+    output = tmp_path/'out'
+    main(['unformat', schema_path, str(deck), str(output)])
+    assert sorted(p.name for p in output.iterdir()) == ['Elem.csv', 'NodeCount.csv', 'NodeLine.csv', '_index.csv']
+    assert (output/'Elem.csv').read_text().splitlines() == ['Num,Nodes,Kind', '1,"[1, 2]",tri', '2,"[2, 3]",quad']
+
+def test_stream_npz_error(tmp_path, schema_path, deck, capsys):
+    with pytest.raises(SystemExit) as exc:
+        main(['unformat', schema_path, str(deck), str(tmp_path/'out.npz'), '--stream'])
+    assert exc.value.code == 1
+    assert 'can not be streamed' in capsys.readouterr().err
+
+def test_invalid_deck(tmp_path, schema_path, deck, capsys):
+    deck.write_text(deck.read_text()+'foo\n')
+    output = tmp_path/'out.jsonl'
+    with pytest.raises(SystemExit):
+        main(['unformat', schema_path, str(deck), str(output)])
+    assert 'Failed to read at line #56' in capsys.readouterr().err
+    # nothing is written unless streaming
+    assert not output.exists()
+
+def test_profile(tmp_path, schema_path, deck, capsys):
+    stats = tmp_path/'stats.prof'
+    main(['unformat', schema_path, str(deck), str(tmp_path/'out.jsonl'), '--profile'])
+    err = capsys.readouterr().err
+    assert 'function calls' in err
+    assert 'NodeLine' in err and '(blank)' in err
+    main(['format', schema_path, str(tmp_path/'out.jsonl'), str(tmp_path/'deck2.txt'), '--profile', str(stats)])
+    assert stats.stat().st_size
+    assert 'Elem' in capsys.readouterr().err
@@ -0,0 +1,39 @@
+from parmatter import FormatGroup
+from parmatter.parmatters import BlankParmatter
+import pytest
+
+@pytest.fixture
+def NodeLine():
+    return FormatGroup('NodeLine', Num = '{: >5d}', X = ('{: >10f}', 0), Y = ('{: >10f}', 0), prefix = 'N', sep = ',')
+
+def test_specialize(NodeLine):
+    fast = NodeLine.specialize()
+    assert NodeLine._specialized is fast
+    assert 'def format(Num, X=_default_X, Y=_default_Y):' in fast.source
+    assert 'def unformat(string):' in fast.source
+    
+@pytest.mark.parametrize('args', [(1, 5, 6.3), (1,), (2, 3)])
+def test_specialized_format(NodeLine, args):
+    assert NodeLine.specialize().format(*args) == NodeLine.format(*args)
+    
+def test_specialized_unformat(NodeLine):
+    string = NodeLine.format(1, 5, 6.3)
+    fast, slow = NodeLine.specialize().unformat(string), NodeLine.unformat(string)
+    assert fast.fixed == slow.fixed
+    assert type(fast.fixed) is type(slow.fixed)
+    assert fast.spans == slow.spans
+    assert NodeLine.specialize().unformat('foo') is None
+    
+def test_specialized_missing_member():
+    ALineDef = FormatGroup('ALineDef', a = '{: >5d}', b = ('{: >10f}', 0), c = ('{: >2s}', ''), d = '{}')
+    fast = ALineDef.specialize()
+    assert fast.format(1, d='x') == ALineDef.format(1, dict(d='x'))
+    with pytest.raises(IndexError):
+        fast.format(1)
+        
+def test_specialized_member_fallback():
+    Blank = FormatGroup('Blank', formatter_type = type('_', (BlankParmatter,), dict(args_parse=staticmethod(lambda *args: (args, {})))), a = '{: >5.1fblank}', b = '{: >5.1fblank}')
+    fast = Blank.specialize()
+    assert '_m_a.format' in fast.source
+    assert fast.format(0, 1.1) == Blank.format(0, 1.1) == '       1.1'
+    assert fast.unformat('       1.1').fixed == Blank.unformat('       1.1').fixed
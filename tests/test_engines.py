@@ -0,0 +1,79 @@
+from parmatter import FormatGroup, unformat_lines
+from parmatter.group.engines import EngineStore, slice_unformat, fingerprint
+import pytest
+
+@pytest.fixture
+def NodeLine():
+    return FormatGroup('NodeLine', Num = '{: >5d}', X = ('{: >10.3f}', 0), Mat = ('{:*^7s}', 'x'), prefix = 'N', sep = ',')
+
+@pytest.fixture
+def lines(NodeLine):
+    return [NodeLine.format(i, i/3, 'st') for i in range(50)] + ['foo', 'N    1,     0.000,  st   ']
+
+def test_slice_unformat(NodeLine, lines):
+    unformat = slice_unformat(NodeLine)
+    for line in lines:
+        fast, slow = unformat(line), NodeLine.unformat(line)
+        if slow is None:
+            assert fast is None
+        else:
+            assert (fast.fixed, fast.spans) == (slow.fixed, slow.spans)
+    assert slice_unformat(FormatGroup('Free', a = '{}')) is None
+
+def test_calibrate(NodeLine, lines):
+    calibration = NodeLine.calibrate(lines, repeat=1)
+    assert calibration.unformat in ('parse', 'specialized', 'slice')
+    assert ('unformat', 'slice') in calibration.timings
+    assert NodeLine._engines == (calibration.unformat, calibration.format)
+    struct, result = unformat_lines(lines[:3], {None:(NodeLine,), NodeLine:(NodeLine,)})
+    assert result[2].fixed == (2, 0.667, 'st')
+    assert NodeLine.format(1, 2.0, 'a') == 'N    1,     2.000,***a***'
+    assert NodeLine.format(dict(Num=1)) == 'N    1,     0.000,***x***'
+    assert NodeLine.unformat(lines[0], evaluate_result=False).evaluate_result() is not None
+
+def test_calibrate_mismatch(NodeLine):
+    # lines the parse engine rejects (int with a trailing space) are rejected by the slice engine
+    line = 'N   1 ,     2.000,***a***'
+    assert slice_unformat(NodeLine)(line) is None
+    calibration = NodeLine.calibrate([line, NodeLine.format(1, 2.0, 'a')], repeat=1)
+    assert NodeLine.unformat(line) is None
+    # without a sep the parser needs a space between the members
+    N = FormatGroup('N', Num = '{: >5d}', X = ('{: >10f}', 0))
+    line = N.format(12345, 123.4567891)
+    assert type(N).unformat(N, line) is None
+    assert slice_unformat(N)(line) is None
+    assert slice_unformat(N)(N.format(1, 2.5)).fixed == (1, 2.5)
+    N.calibrate([line, N.format(1, 2.5)], repeat=1)
+    N.pin_engines('slice')
+    assert N.unformat(line) is None
+
+def test_slice_detection():
+    A = FormatGroup('A', Num = '{: >5d}', X = '{: >10.3f}')
+    B = FormatGroup('B', Num = '{: >5d}', X = '{: >10.3e}')
+    line_rules = {None:(A, B), A:(A, B), B:(A, B)}
+    lines = [A.format(1, 2.5), B.format(2, 100.0), '  1_0     2.000', '    1   1_0.000']
+    expected = unformat_lines(lines[:2], line_rules).struct
+    A.pin_engines('slice')
+    assert unformat_lines(lines[:2], line_rules).struct == expected == [A, B]
+    # the parse regex rejects underscores and exponents in f fields; so does the slice engine
+    for line in lines[1:]:
+        assert A.unformat(line) is None
+    # lines with extra spaces are matched like the parse engine does
+    assert A.unformat('1 2.000').fixed == type(A).unformat(A, '1 2.000').fixed == (1, 2.0)
+
+def test_pin_engines(NodeLine):
+    NodeLine.pin_engines('slice', 'specialized')
+    assert 'unformat' in vars(NodeLine)
+    NodeLine.pin_engines()
+    assert 'unformat' not in vars(NodeLine)
+    with pytest.raises(ValueError):
+        FormatGroup('Free', a = '{}').pin_engines('slice')
+
+def test_EngineStore(tmp_path, NodeLine, lines):
+    path = str(tmp_path/'engines.json')
+    calibration = NodeLine.calibrate(lines, EngineStore(path), repeat=1)
+    store = EngineStore(path)
+    assert store.get(NodeLine) == (calibration.unformat, calibration.format)
+    store.set(NodeLine, 'parse', 'vformat')
+    assert NodeLine.calibrate(lines, EngineStore(path)) == ('parse', 'vformat', {})
+    assert fingerprint(NodeLine) != fingerprint(FormatGroup('NodeLine', Num = '{: >6d}'))
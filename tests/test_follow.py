@@ -0,0 +1,55 @@
+from parmatter.follow import LineFollower, follow
+import os
+import pytest
+
+@pytest.fixture
+def line_rules(CountedNodes, NodeLine):
+    return {None:(CountedNodes,), CountedNodes:(CountedNodes,), NodeLine:(CountedNodes,)}
+    
+def write(path, text, mode='a'):
+    with open(path, mode) as f:
+        f.write(text)
+        
+def test_poll(tmp_path, line_rules, CountedNodes, NodeLine):
+    path = tmp_path/'log.txt'
+    follower = LineFollower(path, line_rules)
+    assert follower.poll() == ([], [])
+    write(path, '    2\n    1    0.0000    0.0000\n    2    1.0000    0.', 'w')
+    # the count line waits for its whole block
+    assert follower.poll() == ([], [])
+    write(path, '0000\n    1\n')
+    struct, result = follower.poll()
+    assert struct == [CountedNodes, NodeLine, NodeLine]
+    assert result[2].fixed == (2, 1.0, 0.0)
+    assert follower.line_number == 4
+    write(path, '    3    2.0000    0.0000\n')
+    struct, result = follower.poll()
+    assert struct == [CountedNodes, NodeLine]
+    assert result[1].fixed.Num == 3
+    assert follower.poll() == ([], [])
+    
+def test_poll_invalid(tmp_path, line_rules):
+    path = tmp_path/'log.txt'
+    write(path, '    0\nfoo\n', 'w')
+    follower = LineFollower(path, line_rules)
+    with pytest.raises(TypeError) as exc:
+        follower.poll()
+    assert 'line #2' in str(exc.value)
+    assert follower.offset == 0
+    
+def test_poll_truncated_and_rotated(tmp_path, line_rules, CountedNodes):
+    path = tmp_path/'log.txt'
+    write(path, '    0\n    0\n', 'w')
+    follower = LineFollower(path, line_rules)
+    assert len(follower.poll().struct) == 2
+    write(path, '    0\n', 'w')
+    assert follower.poll().struct == [CountedNodes]
+    os.rename(path, tmp_path/'log.1.txt')
+    assert follower.poll() == ([], [])
+    write(path, '    0\n    0\n    0\n', 'w')
+    assert len(follower.poll().struct) == 3
+    
+def test_follow(tmp_path, line_rules, CountedNodes):
+    path = tmp_path/'log.txt'
+    write(path, '    0\n    0\n', 'w')
+    assert [LineType for LineType, _ in follow(path, line_rules, interval=0.01, idle_timeout=0.05)] == [CountedNodes]*2
@@ -0,0 +1,56 @@
+from parmatter import FormatGroup, unformat_lines, format_lines
+from parmatter.interning import InternTable, CategoryTable
+import pytest
+
+def test_InternTable():
+    t = InternTable(maxsize=1)
+    a = ''.join(['ste', 'el'])
+    b = ''.join(['ste', 'el'])
+    assert a is not b
+    assert t(a) is a
+    assert t(b) is a
+    assert t('foo') == 'foo'
+    assert len(t) == 1
+    assert t([1, 2]) == [1, 2]
+    
+def test_CategoryTable():
+    t = CategoryTable(maxsize=2)
+    assert [t('steel'), t('alum'), t('steel')] == [0, 1, 0]
+    assert t.decode(1) == 'alum'
+    assert t.categories == ['steel', 'alum']
+    with pytest.raises(ValueError):
+        t('wood')
+        
+@pytest.fixture
+def lines():
+    return ['    1   steel', '    2   steel', '    3    alum']
+    
+def test_intern_member(lines):
+    Elem = FormatGroup('Elem', Num = '{: >5d}', Mat = '{: >8s}', intern = ('Mat',))
+    struct, result = unformat_lines(lines, {None:(Elem,), Elem:(Elem,)})
+    assert result[0].fixed.Mat == 'steel'
+    assert result[0].fixed.Mat is result[1].fixed.Mat
+    assert len(Elem._intern_tables['Mat']) == 2
+    fast = Elem.specialize()
+    assert fast.unformat(lines[0]).fixed.Mat is result[0].fixed.Mat
+    
+def test_category_member(lines):
+    materials = CategoryTable()
+    Elem = FormatGroup('Elem', Num = '{: >5d}', Mat = '{: >8s}', intern = dict(Mat = materials))
+    types, index, columns = unformat_lines(lines, {None:(Elem,), Elem:(Elem,)}, columnar=True)
+    assert columns[Elem]['Mat'].typecode == 'q'
+    assert list(columns[Elem]['Mat']) == [0, 0, 1]
+    assert materials.decode(1) == 'alum'
+    
+def test_category_round_trip(lines):
+    Elem = FormatGroup('Elem', Num = '{: >5d}', Mat = '{: >8s}', intern = dict(Mat = CategoryTable()))
+    unformat_file = unformat_lines(lines, {None:(Elem,), Elem:(Elem,)})
+    assert unformat_file.result[2].fixed.Mat == 1
+    assert Elem.decode(unformat_file.result[2].fixed) == (3, 'alum')
+    assert list(format_lines(zip(*unformat_file))) == lines
+    # records that aren't unformat results are formatted as given
+    assert Elem.format(4, 'wood') == '    4    wood'
+    
+def test_intern_non_member():
+    with pytest.raises(ValueError):
+        FormatGroup('Elem', Num = '{: >5d}', intern = ('Mat',))
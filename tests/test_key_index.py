@@ -0,0 +1,56 @@
+from parmatter import FormatGroup, unformat_lines
+from parmatter.key_index import KeyIndex, key_indexes
+import pytest
+
+@pytest.fixture
+def NodeLine():
+    return FormatGroup('NodeLine', Num = '{: >5d}', X = ('{: >10f}', 0), key = 'Num')
+
+@pytest.fixture
+def Header():
+    return FormatGroup('Header', Title = '{: >5s}')
+
+@pytest.fixture
+def line_rules(Header, NodeLine):
+    return {None:(Header,), Header:(NodeLine,), NodeLine:(NodeLine,)}
+
+def test_key_member_check():
+    with pytest.raises(ValueError):
+        FormatGroup('Bad', Num = '{: >5d}', key = 'Foo')
+
+def test_unformat_keyed(line_rules, Header, NodeLine):
+    lines = ['nodes', '    5    1.0000', '    2    2.0000', '    9    3.0000']
+    struct, result, keys = unformat_lines(lines, line_rules, keyed=True)
+    assert list(keys) == [NodeLine]
+    index = keys[NodeLine]
+    assert len(index) == 3
+    assert result[index[2]].fixed.X == 2.0
+    assert index.get(3) is None
+    assert 9 in index
+    assert list(index.keys()) == [2, 5, 9]
+    assert list(index.range(3, 9)) == [1]
+    assert list(index.range(2)) == [2, 1, 3]
+    assert list(index.range(stop=6)) == [2, 1]
+    assert list(key_indexes(struct, result)[NodeLine].range()) == [2, 1, 3]
+
+def test_unformat_keyed_select(line_rules, NodeLine):
+    lines = ['nodes', '    5    1.0000', '    2    2.0000']
+    struct, result, keys = unformat_lines(lines, line_rules, keyed=True, select={NodeLine:['X']})
+    # the key member is kept
+    assert result[keys[NodeLine][2]].fixed == (2.0, 2)
+    assert result[0].fixed._fields == ('X', 'Num')
+
+def test_duplicate_key(line_rules):
+    with pytest.raises(ValueError) as exc:
+        unformat_lines(['nodes', '    1    1.0000', '    1    2.0000'], line_rules, keyed=True)
+    assert 'positions 1 and 2' in str(exc.value)
+
+def test_KeyIndex_ascending(NodeLine):
+    index = KeyIndex(NodeLine)
+    for position, key in enumerate(range(0, 100, 10)):
+        index.add(key, position)
+    assert index._ascending
+    assert index.keys().typecode == 'q'
+    assert list(index.range(15, 45)) == [2, 3, 4]
+    index.add(5, 10)
+    assert list(index.range(0, 11)) == [0, 10, 1]
@@ -0,0 +1,50 @@
+from parmatter.line_index import build_index, get_index, index_path, LineIndex, unformat_records, unformat_section
+import pytest
+
+@pytest.fixture
+def deck(tmp_path):
+    path = tmp_path/'deck.txt'
+    nodes = ''.join('{: >5d}{: >10.3f}{: >10.3f}\n'.format(i, i/2, 0) for i in range(1, 301))
+    path.write_text('  300\n' + nodes + '\n  300\n' + nodes)
+    return path
+    
+def test_build_index(deck, line_rules, NodeCount, NodeLine):
+    index = build_index(deck, line_rules)
+    assert len(index) == 603
+    assert index.types == [NodeCount, NodeLine, None]
+    assert index.count(NodeLine) == 600
+    assert index.count(NodeCount) == 2
+    assert index.line_type(301) is None
+    assert list(index.record_lines(NodeCount)) == [0, 302]
+    assert index.record_number(NodeLine, 302) == 300
+    
+def test_unformat_records(deck, line_rules, NodeLine):
+    index = build_index(deck, line_rules)
+    records = unformat_records(deck, index, NodeLine, 298, 302)
+    assert [r.fixed.Num for r in records] == [299, 300, 1, 2]
+    assert records[0].fixed.X == 149.5
+    
+def test_unformat_section(deck, line_rules, NodeCount, NodeLine):
+    index = build_index(deck, line_rules)
+    struct, result = unformat_section(deck, index, 300, 304)
+    assert struct == [NodeLine, None, NodeCount, NodeLine]
+    assert result[1] is None
+    assert result[2].fixed.Total == 300
+    
+def test_sidecar(deck, line_rules, NodeLine):
+    index = get_index(deck, line_rules)
+    loaded = LineIndex.load(index_path(deck), line_rules)
+    assert loaded.types == index.types
+    assert list(loaded.offsets) == list(index.offsets)
+    assert list(loaded.codes) == list(index.codes)
+    assert list(loaded.record_lines(NodeLine)) == list(index.record_lines(NodeLine))
+    assert unformat_records(deck, loaded, NodeLine, 599)[0].fixed.Num == 300
+    # out of date sidecar is rebuilt
+    with open(deck, 'a') as f:
+        f.write('\n')
+    assert len(get_index(deck, line_rules)) == 604
+    
+def test_sidecar_unknown_type(deck, line_rules, NodeCount):
+    get_index(deck, line_rules)
+    with pytest.raises(ValueError):
+        LineIndex.load(index_path(deck), {None:(NodeCount,)})
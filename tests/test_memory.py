@@ -0,0 +1,82 @@
+from parmatter import FormatGroup, unformat_lines, unformat_file
+from parmatter.memory import memory_report, estimate_path, deep_sizeof, unformat_sample
+import gzip
+import sys
+import pytest
+
+@pytest.fixture
+def Header():
+    return FormatGroup('Header', Title = '{: >8s}')
+
+@pytest.fixture
+def Elem():
+    return FormatGroup('Elem', Num = '{: >5d}', Mat = '{: >8s}', intern = ('Mat',))
+
+@pytest.fixture
+def line_rules(Header, Elem):
+    return {None:(Header,), Header:(Elem,), Elem:(Elem,)}
+
+@pytest.fixture
+def lines():
+    return ['elements'] + ['{: >5d}{: >8s}'.format(1000+i, 'steel') for i in range(200)]
+
+def test_deep_sizeof():
+    value = 'x'*100
+    seen = set()
+    assert deep_sizeof([value, value], seen) == sys.getsizeof([value, value]) + sys.getsizeof(value)
+    assert deep_sizeof(value, seen) == 0
+
+def test_memory_report(lines, line_rules, Header, Elem):
+    report = memory_report(unformat_lines(lines, line_rules))
+    assert report.lines == 201
+    assert report.types[Header].lines == 1
+    elem = report.types[Elem]
+    assert elem.lines == 200
+    # the interned material name is counted once
+    assert elem.members['Mat'] == sys.getsizeof('steel')
+    assert elem.members['Num'] == 200*sys.getsizeof(1000)
+    assert elem.total == elem.overhead + sum(elem.members.values())
+    assert report.total == report.containers + sum(t.total for t in report.types.values())
+
+def test_estimate_path(tmp_path, lines, line_rules):
+    path = tmp_path/'deck.txt'
+    path.write_text('\n'.join(lines*1 + lines[1:]*9)+'\n')
+    estimate = estimate_path(str(path), line_rules, sample_lines=201)
+    assert estimate.sample_lines == 201
+    assert estimate.file_bytes == path.stat().st_size
+    # about ten times the sample
+    sample = memory_report(unformat_lines(lines, line_rules)).total
+    assert 9*sample < estimate.retained < 11*sample
+    assert estimate.columnar < estimate.retained
+    assert estimate.traced > 0
+
+def test_estimate_path_count_block(tmp_path, Elem):
+    Count = FormatGroup('Count', Total = '{: >5d}', count = ('Total', Elem))
+    lines = ['  200'] + ['{: >5d}{: >8s}'.format(i, 'steel') for i in range(200)]
+    path = tmp_path/'deck.txt'
+    path.write_text('\n'.join(lines)+'\n')
+    # the sample ends inside the counted block
+    estimate = estimate_path(str(path), {None:(Count,)}, sample_lines=50)
+    assert estimate.sample_lines == 50
+    assert estimate.retained > 0
+
+def test_estimate_path_count_batches(tmp_path, monkeypatch, Elem):
+    # the sample ends after whole batches of the counted block were decoded
+    monkeypatch.setattr(unformat_file, 'block_batch_size', 16)
+    Count = FormatGroup('Count', Total = '{: >5d}', count = ('Total', Elem))
+    lines = ['  200'] + ['{: >5d}{: >8s}'.format(i, 'steel') for i in range(200)]
+    path = tmp_path/'deck.txt'
+    path.write_text('\n'.join(lines)+'\n')
+    sample = unformat_sample(lines[:50], {None:(Count,)})
+    assert sample.struct == [Count] + [Elem]*49
+    estimate = estimate_path(str(path), {None:(Count,)}, sample_lines=50)
+    assert estimate.sample_lines == 50
+    
+def test_estimate_path_compressed(tmp_path, lines, line_rules):
+    plain = tmp_path/'deck.txt'
+    plain.write_text('\n'.join(lines + lines[1:]*9)+'\n')
+    compressed = tmp_path/'deck.txt.gz'
+    compressed.write_bytes(gzip.compress(plain.read_bytes()))
+    estimate = estimate_path(str(compressed), line_rules, sample_lines=201)
+    assert estimate.file_bytes == plain.stat().st_size
+    assert estimate.retained == estimate_path(str(plain), line_rules, sample_lines=201).retained
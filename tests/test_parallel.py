@@ -0,0 +1,115 @@
+from parmatter import FormatGroup, unformat_lines
+from parmatter.format_file import format_record
+from parmatter.interning import CategoryTable
+from parmatter.parallel import format_parallel, shards, iunformat_parallel
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+
+@pytest.fixture
+def NodeLine():
+    return FormatGroup('NodeLine', Num = '{: >5d}', X = ('{: >10f}', 0), Y = ('{: >10f}', 0), sep = ',')
+    
+@pytest.fixture
+def records():
+    return [(i, i/3, -i) for i in range(1, 1001)]
+    
+def serial(cls, records):
+    return ''.join(format_record(cls, record)+'\n' for record in records)
+    
+def test_shards():
+    assert list(shards(list(range(5)), 2)) == [[0, 1], [2, 3], [4]]
+    assert list(shards(iter(range(5)), 2)) == [[0, 1], [2, 3], [4]]
+    
+def test_definition(NodeLine):
+    Rebuilt = NodeLine.definition().build()
+    assert Rebuilt is not NodeLine
+    assert Rebuilt.format(1, 2, 3) == NodeLine.format(1, 2, 3)
+    Elem = FormatGroup('Elem', Num = '{: >5d}', Mat = '{: >6s}', key = 'Num', intern = dict(Mat = CategoryTable()))
+    Count = FormatGroup('Count', Total = '{: >5d}', count = ('Total', Elem))
+    Rebuilt = Count.definition().build()
+    count_member, RebuiltElem = Rebuilt._count
+    assert count_member == 'Total' and RebuiltElem.definition() == Elem.definition()
+    assert RebuiltElem._key == 'Num'
+    assert type(RebuiltElem._intern_tables['Mat']) is CategoryTable
+    assert RebuiltElem._intern_tables['Mat'] is not Elem._intern_tables['Mat']
+    
+@pytest.mark.parametrize('workers', [1, 2])
+def test_format_parallel(NodeLine, records, workers):
+    assert format_parallel(NodeLine, records, workers=workers, shard_size=64) == serial(NodeLine, records)
+    
+def test_format_parallel_unformat_results(records):
+    # the Data namedtuples of unformat results can't be pickled
+    Elem = FormatGroup('Elem', Num = '{: >5d}', Mat = '{: >6s}', intern = dict(Mat = CategoryTable()))
+    lines = [Elem.format(i, 'm{}'.format(i%3)) for i in range(50)]
+    results = unformat_lines(lines, {None:(Elem,), Elem:(Elem,)}).result
+    expected = ''.join(line+'\n' for line in lines)
+    assert format_parallel(Elem, results, workers=2, shard_size=8) == expected
+    assert format_parallel(Elem, [r.fixed for r in results], workers=2, shard_size=8) == expected
+    
+def test_format_parallel_path(tmp_path, NodeLine, records):
+    path = tmp_path/'nodes.txt'
+    format_parallel(NodeLine, iter(records), path, workers=2, shard_size=100)
+    assert path.read_text() == serial(NodeLine, records)
+    
+def test_format_parallel_threads(NodeLine, records):
+    assert format_parallel(NodeLine, records, workers=4, shard_size=64, backend='thread') == serial(NodeLine, records)
+    with pytest.raises(ValueError):
+        format_parallel(NodeLine, records, workers=2, backend='fibers')
+    
+def test_iunformat_parallel(NodeLine, records):
+    lines = serial(NodeLine, records).splitlines()
+    line_rules = {None:(NodeLine,), NodeLine:(NodeLine,)}
+    items = list(iunformat_parallel(lines, line_rules, workers=4, shard_size=50))
+    assert [result.fixed for _, result in items] == [result.fixed for result in unformat_lines(lines, line_rules).result]
+    
+def test_iunformat_parallel_resolution():
+    # identical patterns: the LineType of each line depends on the one before it
+    A = FormatGroup('A', Num = '{: >5d}')
+    B = FormatGroup('B', Num = '{: >5d}')
+    C = FormatGroup('C', Name = '{: >5s}')
+    line_rules = {None:(A, C), A:(B,), B:(A, C), C:(A,)}
+    lines = ['{: >5d}'.format(i) for i in range(20)] + ['', '    x', '    1', '    2', '', '    3']
+    expected = unformat_lines(lines, line_rules)
+    for shard_size in (1, 2, 3, 7):
+        items = list(iunformat_parallel(lines, line_rules, workers=3, shard_size=shard_size))
+        assert [LineType for LineType, _ in items] == expected.struct
+        assert [result and result.fixed for _, result in items] == [result and result.fixed for result in expected.result]
+    items = []
+    with pytest.raises(TypeError) as exc:
+        for item in iunformat_parallel(lines[:5]+['    x']+lines[5:], line_rules, workers=2, shard_size=2):
+            items.append(item)
+    assert 'line #6' in str(exc.value)
+    assert len(items) == 5
+    
+def test_thread_safety():
+    # groups, parsers and intern tables built and used concurrently
+    def build(i):
+        Elem = FormatGroup('Elem', Num = '{: >5d}', Mat = '{: >8s}', intern = dict(Mat = table))
+        return [Elem.unformat(Elem.format(j, 'mat{}'.format(j%7))).fixed.Mat for j in range(200)]
+    from parmatter.interning import CategoryTable
+    table = CategoryTable()
+    with ThreadPoolExecutor(8) as executor:
+        results = list(executor.map(build, range(16)))
+    assert sorted(table.categories) == sorted('mat{}'.format(j) for j in range(7))
+    assert all(result == results[0] for result in results)
+    
+def test_lazy_caches_thread_safety(NodeLine):
+    # projections, pinned engines and partial format strings built concurrently
+    line = NodeLine.format(3, 1.5, 2.0)
+    match = NodeLine.unformat(line, evaluate_result=False)
+    def use(i):
+        if i % 4 == 0:
+            NodeLine.pin_engines('slice' if i % 8 else 'parse')
+        project = NodeLine.projection(['Y', 'Num'])
+        member = NodeLine._formatters['X']
+        return project, project(match).fixed, NodeLine.unformat(line).fixed, member.format()
+    with ThreadPoolExecutor(8) as executor:
+        results = list(executor.map(use, range(64)))
+    assert len({project for project, *_ in results}) == 1
+    assert {result[1:] for result in results} == {((2.0, 3), (3, 1.5, 2.0), NodeLine._formatters['X'].format(0))}
+    
+def test_read_only_group(NodeLine):
+    with pytest.raises(TypeError):
+        NodeLine._formatters['Z'] = None
+    with pytest.raises(TypeError):
+        NodeLine._intern_tables['X'] = None
@@ -76,4 +76,43 @@ def test_StaticParmatter_parse():
 def test_VersatileParmatter_parse(format, string, values):
     f=VersatileParmatter(format)
     test = f.unformat(string)
-    assert tuple(test) == values
\ No newline at end of file
+    assert tuple(test) == values
+def test_partial_defaults():
+    f=VersatileParmatter('{{{: >5d}}}{: >5d}{a: >5d}', 1, 2, default_namespace=dict(a=3))
+    assert f.format() == '{    1}    2    3'
+    assert f.partial_format_str(f.default_namespace, 1, {}) == ('{{{0: >5d}}}    2{a: >5d}', True)
+    assert f.format(4) == '{    4}    2    3'
+    assert f.format(4, 5, a=6) == '{    4}    5    6'
+    # defaults changed
+    f.default_namespace[1] = 7
+    assert f.format(4) == '{    4}    7    3'
+    assert f.format() == '{    1}    7    3'
+    f.default_namespace.update(a=8)
+    assert f.format(4) == '{    4}    7    8'
+    del f.default_namespace['a']
+    with pytest.raises(KeyError):
+        f.format(4)
+
+def test_partial_defaults_attributes():
+    f=VersatileParmatter('{: >5d}{a: >5d}', 1, default_namespace=dict(a=3))
+    assert f.format() == '    1    3'
+    class C(): pass
+    c=C()
+    c.a = 2
+    assert f.format(1, c) == '    1    2'
+    
+def test_partial_defaults_errors():
+    f=VersatileParmatter('{: >5d}{: >5d}', '', 2)
+    with pytest.raises(ValueError):
+        f.format()
+    assert f.format(1) == '    1    2'
+    f=VersatileParmatter('{: >5d}{: >5d}', 1)
+    with pytest.raises(IndexError):
+        f.format()
+    
+def test_default_namespace_not_shared():
+    a=VersatileParmatter('{: >5d}', 7)
+    b=VersatileParmatter('{: >5d}')
+    assert a.default_namespace is not b.default_namespace
+    with pytest.raises(IndexError):
+        b.format()
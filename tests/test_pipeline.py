@@ -0,0 +1,46 @@
+from parmatter import FormatGroup, unformat_lines
+from parmatter.pipeline import iunformat_pipeline, iunformat_pipeline_path
+import threading
+import pytest
+
+@pytest.fixture
+def Elem():
+    return FormatGroup('Elem', Num = '{: >5d}')
+
+@pytest.fixture
+def NodeCount(Elem):
+    return FormatGroup('NodeCount', Total = '{: >5d}', count = ('Total', Elem))
+
+@pytest.fixture
+def line_rules(NodeCount, NodeLine, Elem):
+    return {None:(NodeCount,), Elem:(NodeLine,), NodeLine:(NodeLine,)}
+
+@pytest.fixture
+def lines():
+    return ['    2', '    1', '    2'] + ['{: >5d}{: >10.3f}{: >10.3f}'.format(i, i/4, 0) for i in range(100)] + ['', '    0']
+
+def test_iunformat_pipeline(lines, line_rules):
+    expected = unformat_lines(lines, line_rules)
+    items = list(iunformat_pipeline(lines, line_rules, batch_size=7, max_batches=2, workers=3))
+    assert [LineType for LineType, _ in items] == expected.struct
+    assert [result and result.fixed for _, result in items] == [result and result.fixed for result in expected.result]
+
+def test_iunformat_pipeline_error(lines, line_rules):
+    items = []
+    with pytest.raises(TypeError) as exc:
+        for item in iunformat_pipeline(lines[:10]+['foo']+lines[10:], line_rules, batch_size=3):
+            items.append(item)
+    assert 'line #11' in str(exc.value)
+    assert len(items) == 10
+
+def test_iunformat_pipeline_early_stop(lines, line_rules):
+    threads = threading.active_count()
+    items = iunformat_pipeline(lines*50, line_rules, batch_size=5, max_batches=1)
+    next(items)
+    items.close()
+    assert threading.active_count() == threads
+
+def test_iunformat_pipeline_path(tmp_path, lines, line_rules):
+    path = tmp_path/'deck.txt'
+    path.write_text('\n'.join(lines)+'\n')
+    assert len(list(iunformat_pipeline_path(str(path), line_rules, batch_size=16))) == len(lines)
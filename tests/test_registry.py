@@ -0,0 +1,72 @@
+from parmatter import StaticParmatter, FormatGroup
+from parmatter.registry import ParserRegistry, parser_registry
+import datetime
+
+def test_ParserRegistry():
+    r = ParserRegistry(maxsize=2)
+    a = r.compile('{: >5d}', dict(s=str))
+    assert r.compile('{: >5d}', dict(s=str)) is a
+    assert r.compile('{: >5d}', dict(s=str, x=int)) is not a
+    assert r.info() == (1, 2, 0, 2, 2)
+    r.compile('{: >5f}')
+    assert r.info().evictions == 1
+    assert len(r) == 2
+    r.clear()
+    assert r.info() == (0, 0, 0, 2, 0)
+    
+def test_ParserRegistry_copies_extra_types():
+    r = ParserRegistry()
+    extra_types = dict(s=str)
+    p = r.compile('{: >5d}', extra_types)
+    extra_types.update(x=int)
+    assert p._extra_types == dict(s=str)
+
+def test_shared_parsers():
+    hits = parser_registry.info().hits
+    a = StaticParmatter('{: >7.3f}')
+    b = StaticParmatter('{: >7.3f}')
+    assert a._parser is b._parser
+    assert parser_registry.info().hits > hits
+    A = FormatGroup('A', x = '{: >7.3f}', y = ('{: >7.3f}', 0))
+    x, y = A
+    assert x._parser is y._parser is a._parser
+
+def test_spec_types():
+    from parmatter.registry import spec_types
+    from parmatter.parmatters import BlankParmatter, FloatIntParmatter
+    assert spec_types['dblank'] is spec_types['dblank']
+    assert spec_types['dblank'].pattern != r'.+?'
+    assert 'xblank' not in spec_types
+    a = BlankParmatter('{: >5dblank}{: >5dblank}')
+    b = BlankParmatter('{: >5dblank}{: >5dblank}')
+    assert a._parser is b._parser
+    assert a.unformat('    1     ').fixed == (1, 0)
+    # tight patterns keep adjacent fields apart
+    assert FloatIntParmatter('{:fd}{:d}').unformat('1.5x') is None
+    default = FloatIntParmatter.set_parser.__defaults__[0]
+    assert default == dict(s=str)
+
+def test_register_spec_type():
+    from parmatter.registry import register_spec_type
+    register_spec_type('hex', lambda s: int(s, 16), r'[0-9a-fA-F]+')
+    p = StaticParmatter('{:hex}-{:hex}')
+    assert p.unformat('ff-10').fixed == (255, 16)
+
+def test_extra_types_unregistered_specs():
+    # specs that aren't registered spec types are left to the parse module
+    assert StaticParmatter('{:5.1%}').unformat(' 50.0%').fixed == (0.5,)
+    assert StaticParmatter('{:%Y-%m-%d}').unformat('2020-01-02').fixed[0].day == 2
+    G = FormatGroup('G', P = '{:>6.1%}', D = '{:%Y-%m-%d}', N = '{: >3d}', sep = ',')
+    line = G.format(0.5, datetime.date(2020, 1, 2), 7)
+    assert line == ' 50.0%,2020-01-02,  7'
+    assert G.unformat(line).fixed == (0.5, datetime.date(2020, 1, 2), 7)
+
+def test_group_parser_looked_up_once():
+    G = FormatGroup('G', Num = '{: >7d}', X = '{: >11.4f}')
+    before = parser_registry.info()
+    for i in range(1000):
+        G.unformat(G.format(i, i/2))
+    assert parser_registry.info()[:2] == before[:2]
+    # shared by identical groups
+    assert FormatGroup('H', Num = '{: >7d}', X = '{: >11.4f}').parser() is G.parser()
+    assert parser_registry.info().hits > before.hits
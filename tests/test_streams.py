@@ -0,0 +1,41 @@
+from parmatter import unformat_lines, unformat_path, format_path
+from parmatter.streams import open_lines, detect_compression
+import gzip
+import pytest
+
+@pytest.fixture
+def lines():
+    return ['    2', '    1  0.000000  0.000000', '    2  1.000000  0.000000']
+
+@pytest.mark.parametrize('suffix', ['.txt', '.txt.gz', '.txt.xz', '.txt.bz2'])
+def test_open_lines(tmp_path, suffix):
+    path = tmp_path/('deck'+suffix)
+    with open_lines(path, 'w') as f:
+        f.write('a\nb\n')
+    with open_lines(path) as f:
+        assert list(f) == ['a\n', 'b\n']
+    assert (detect_compression(path) is None) == (suffix == '.txt')
+    
+def test_detect_compression_without_suffix(tmp_path):
+    path = tmp_path/'deck'
+    with gzip.open(path, 'wt') as f:
+        f.write('a\n')
+    with open_lines(path) as f:
+        assert f.read() == 'a\n'
+    
+@pytest.mark.parametrize('suffix', ['.txt', '.txt.gz', '.txt.xz', '.txt.bz2'])
+def test_round_trip(tmp_path, suffix, lines, line_rules, NodeCount, NodeLine):
+    path = tmp_path/('deck'+suffix)
+    format_path(path, zip(*unformat_lines(lines, line_rules)))
+    with open_lines(path) as f:
+        assert f.read() == ''.join(line+'\n' for line in lines)
+    struct, result = unformat_path(path, line_rules)
+    assert struct == [NodeCount, NodeLine, NodeLine]
+    assert result[-1].fixed == (2, 1.0, 0.0)
+    types, index, columns = unformat_path(path, line_rules, columnar=True)
+    assert list(columns[NodeLine]['Num']) == [1, 2]
+    
+def test_format_path_records(tmp_path, NodeLine):
+    path = tmp_path/'deck.txt'
+    format_path(path, [(NodeLine, (1, 2.0)), (None, None), (NodeLine, dict(Num=3))])
+    assert path.read_text() == '    1  2.000000  0.000000\n\n    3  0.000000  0.000000\n'
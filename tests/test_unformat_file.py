@@ -0,0 +1,126 @@
+from parmatter import FormatGroup, unformat_lines, unformat_columns
+from parmatter import unformat_file
+import pytest
+
+@pytest.fixture
+def lines():
+    return ['    2', '    1    0.0000    0.0000', '    2    1.0000    0.0000']
+
+def test_unformat_lines(lines, line_rules, NodeCount, NodeLine):
+    struct, result = unformat_lines(lines, line_rules)
+    assert struct == [NodeCount, NodeLine, NodeLine]
+    assert result[-1].fixed == (2, 1.0, 0.0)
+    
+def test_unformat_lines_invalid(lines, line_rules):
+    with pytest.raises(TypeError) as exc:
+        unformat_lines(lines[:1]+['foo'], line_rules)
+    assert 'line #2' in str(exc.value)
+    
+def test_unformat_columns(lines, line_rules, NodeCount, NodeLine):
+    types, index, columns = unformat_lines(lines+[''], line_rules, columnar=True)
+    assert types == [NodeCount, NodeLine, None]
+    assert list(index) == [0, 1, 1, 2]
+    assert columns[NodeLine]['Num'].typecode == 'q'
+    assert list(columns[NodeLine]['Num']) == [1, 2]
+    assert columns[NodeLine]['X'].typecode == 'd'
+    assert list(columns[NodeLine]['X']) == [0.0, 1.0]
+    assert list(columns[NodeCount]['Total']) == [2]
+    
+def test_unformat_columns_strings(line_rules):
+    Name = FormatGroup('Name', a = '{: >5d}', b = '{: >4s}')
+    types, index, columns = unformat_columns(['    1   x'], {None:(Name,)})
+    assert columns[Name]['b'] == ['x']
+    
+def test_unformat_lines_count(lines, NodeLine, CountedNodes):
+    # the counted lines are not dispatched using the line rules
+    line_rules = {None:(CountedNodes,), CountedNodes:(CountedNodes,), NodeLine:(CountedNodes,)}
+    struct, result = unformat_lines(lines+['    0', '    1', '    3    0.0000    0.0000'], line_rules)
+    assert struct == [CountedNodes, NodeLine, NodeLine, CountedNodes, CountedNodes, NodeLine]
+    assert result[2].fixed == (2, 1.0, 0.0)
+    assert result[-1].fixed.Num == 3
+    
+def test_unformat_lines_count_errors(lines, NodeLine, CountedNodes):
+    line_rules = {None:(CountedNodes,), NodeLine:(CountedNodes,)}
+    with pytest.raises(TypeError) as exc:
+        unformat_lines(['    3']+lines[1:], line_rules)
+    assert 'declares 3 NodeLine lines but only 2 follow' in str(exc.value)
+    with pytest.raises(TypeError) as exc:
+        unformat_lines(['    3']+lines, line_rules)
+    assert 'NodeLine line 1 of 3 (declared at line #1) at line #2' in str(exc.value)
+    
+def test_unformat_lines_count_invalid(lines, NodeLine, CountedNodes):
+    line_rules = {None:(CountedNodes,), CountedNodes:(CountedNodes,), NodeLine:(CountedNodes,)}
+    with pytest.raises(TypeError) as exc:
+        unformat_lines(['   -2']+lines[1:], line_rules)
+    assert 'Line #1 declares an invalid count of NodeLine lines: -2' in str(exc.value)
+    Counted = FormatGroup('Counted', Total = '{: >5f}', count = ('Total', NodeLine))
+    with pytest.raises(TypeError) as exc:
+        unformat_lines(['  2.0']+lines[1:], {None:(Counted,)})
+    assert 'invalid count' in str(exc.value)
+    
+def test_unformat_lines_count_too_small(lines, NodeLine, CountedNodes):
+    line_rules = {None:(CountedNodes,), CountedNodes:(CountedNodes,)}
+    with pytest.raises(TypeError) as exc:
+        unformat_lines(['    1']+lines[1:], line_rules)
+    assert 'line #3' in str(exc.value)
+    assert 'NodeLine lines counted at line #1' in str(exc.value)
+
+def test_unformat_block_batches(monkeypatch, NodeLine, CountedNodes):
+    monkeypatch.setattr(unformat_file, 'block_batch_size', 4)
+    block = ['{: >5d}{: >10.4f}{: >10.4f}'.format(i, i, 0) for i in range(10)]
+    read = []
+    def numbered(lines):
+        for line in lines:
+            read.append(line)
+            yield line
+    items = unformat_file.iunformat_lines(numbered(['   10']+block), {None:(CountedNodes,)})
+    assert [next(items)[1].fixed[0] for _ in range(3)] == [10, 0, 1]
+    # only the first batch has been read
+    assert len(read) == 5
+    assert [result.fixed.Num for _, result in items] == list(range(2, 10))
+    block[6] = 'foo'
+    with pytest.raises(TypeError) as exc:
+        list(unformat_file.iunformat_lines(['   10']+block, {None:(CountedNodes,)}))
+    assert 'NodeLine line 7 of 10 (declared at line #1) at line #8' in str(exc.value)
+    with pytest.raises(unformat_file.IncompleteBlockError) as exc:
+        list(unformat_file.iunformat_lines(['   12']+block[:6], {None:(CountedNodes,)}))
+    assert 'declares 12 NodeLine lines but only 6 follow' in str(exc.value)
+    
+def test_count_member_check(NodeLine):
+    with pytest.raises(ValueError):
+        FormatGroup('CountedNodes', Total = '{: >5d}', count = ('Num', NodeLine))
+    
+@pytest.fixture
+def many_lines():
+    return ['    3', '    1    0.0000    0.0000', '    2    1.0000    0.0000', ' 1001    2.0000    3.0000', '']
+
+def test_unformat_lines_select(many_lines, line_rules, NodeCount, NodeLine):
+    struct, result = unformat_lines(many_lines, line_rules, select={NodeLine:('X',)})
+    assert struct == [NodeLine]*3
+    assert [r.fixed for r in result] == [(0.0,), (1.0,), (2.0,)]
+    assert result[0].fixed._fields == ('X',)
+    assert result[2].spans == {1: NodeLine.unformat(many_lines[3]).spans[1]}
+    struct, result = unformat_lines(many_lines, line_rules, select={NodeLine:None, NodeCount:None})
+    assert result[-1].fixed == (1001, 2.0, 3.0)
+    with pytest.raises(ValueError):
+        unformat_lines(many_lines, line_rules, select={NodeLine:('Z',)})
+    
+def test_unformat_lines_where(many_lines, line_rules, NodeCount, NodeLine):
+    where = {NodeLine:lambda raw: int(raw.Num) > 1000}
+    struct, result = unformat_lines(many_lines, line_rules, select={NodeLine:('X', 'Y')}, where=where)
+    assert [r.fixed for r in result] == [(2.0, 3.0)]
+    struct, result = unformat_lines(many_lines, line_rules, where=where)
+    assert struct == [NodeCount, NodeLine, None]
+    
+def test_unformat_columns_select(many_lines, line_rules, NodeLine):
+    types, index, columns = unformat_columns(many_lines, line_rules, select={NodeLine:('Y',)}, where={NodeLine:lambda raw: raw.Num != '1'})
+    assert types == [NodeLine]
+    assert list(columns[NodeLine]) == ['Y']
+    assert list(columns[NodeLine]['Y']) == [0.0, 3.0]
+
+def test_line_types(line_rules, NodeCount, NodeLine, CountedNodes):
+    assert unformat_file.line_types(line_rules) == dict(NodeCount=NodeCount, NodeLine=NodeLine)
+    # counted LineTypes are included
+    assert unformat_file.line_types({None:(CountedNodes,)}) == dict(CountedNodes=CountedNodes, NodeLine=NodeLine)
+    with pytest.raises(ValueError):
+        unformat_file.line_types({None:(NodeLine, FormatGroup('NodeLine', Num = '{: >3d}'))})
@@ -0,0 +1,40 @@
+from parmatter import FormatGroup, unformat_lines
+from parmatter.validate import validate_lines, validate_path
+import pytest
+
+@pytest.fixture
+def NodeLine():
+    return FormatGroup('NodeLine', Num = '{: >5d}', X = ('{: >10f}', 0), prefix = 'N')
+
+@pytest.fixture
+def lines():
+    return ['    2', 'N    1    0.0000', 'N    2    1.0000']
+
+def test_validate_lines(lines, line_rules):
+    assert validate_lines(lines, line_rules) == []
+    unformat_lines(lines, line_rules)
+
+def test_validate_lines_errors(lines, line_rules, NodeCount, NodeLine):
+    errors = validate_lines(lines[:1] + ['foo'] + lines[1:] + ['bar', '', '    1'], line_rules)
+    assert [error.line_number for error in errors] == [2, 5]
+    assert errors[0].candidates == (NodeLine,)
+    # after an error, every LineType is tried
+    assert errors[1].candidates == (NodeLine,)
+    errors = validate_lines(['foo', 'bar'], line_rules)
+    assert [error.candidates for error in errors] == [(NodeCount,), (NodeCount, NodeLine)]
+    assert validate_lines(['foo', 'bar'], line_rules, max_errors=1)[0].line == 'foo'
+
+def test_validate_count(NodeLine, CountedNodes):
+    line_rules = {None:(CountedNodes,), NodeLine:(CountedNodes,)}
+    assert validate_lines(['    1', 'N    1    0.0000', '    0'], line_rules) == []
+    errors = validate_lines(['    3', 'N    1    0.0000', 'x'], line_rules)
+    assert [(error.line_number, error.candidates) for error in errors] == [(3, (NodeLine,)), (1, (CountedNodes,))]
+    assert 'only 2 follow' in errors[1].reason
+    errors = validate_lines(['   -2', 'N    1    0.0000'], line_rules)
+    assert [(error.line_number, error.candidates) for error in errors] == [(1, (CountedNodes,)), (2, ())]
+    assert 'invalid count' in errors[0].reason
+
+def test_validate_path(tmp_path, lines, line_rules):
+    path = tmp_path/'deck.txt'
+    path.write_text('\n'.join(lines + ['oops'])+'\n')
+    assert [error.line_number for error in validate_path(str(path), line_rules)] == [4]
@@ -0,0 +1,55 @@
+from parmatter import FormatGroup
+from parmatter.parmatters import BlankParmatter, FloatIntParmatter
+import pytest
+import io
+
+np = pytest.importorskip('numpy')
+
+@pytest.fixture
+def NodeLine():
+    return FormatGroup('NodeLine', Num = '{: >5d}', X = ('{: >10f}', 0), Y = ('{: >10.3e}', 0), prefix = 'N', sep = ',')
+    
+def test_format_columns(NodeLine):
+    num, x = np.arange(1, 4), np.array([0.0, 1.5, -2.25])
+    f = io.StringIO()
+    lines = NodeLine.format_columns(num, x, Y=x*1e5, file=f)
+    expected = [NodeLine.format(*args) for args in zip(num, x, x*1e5)]
+    assert lines.tolist() == expected
+    assert f.getvalue() == ''.join(line+'\n' for line in expected)
+    
+def test_format_columns_defaults(NodeLine):
+    assert NodeLine.format_columns(np.arange(2)).tolist() == [NodeLine.format(0), NodeLine.format(1)]
+    
+def test_format_columns_structured(NodeLine):
+    data = np.zeros(2, dtype=[('Num', 'i8'), ('X', 'f8')])
+    data['Num'] = 7
+    assert NodeLine.format_columns(data).tolist() == [NodeLine.format(7, 0.0)]*2
+    
+def test_format_columns_errors(NodeLine):
+    with pytest.raises(ValueError):
+        NodeLine.format_columns(np.arange(2), np.arange(3.0))
+    with pytest.raises(ValueError):
+        NodeLine.format_columns(Z=np.arange(2))
+    
+@pytest.mark.parametrize('spec', ['{: >5.1fblank}', '{:*^6dblank}', '{:<7.2fdblank}'])
+def test_format_columns_blank(spec):
+    blank_type = type('_', (BlankParmatter, FloatIntParmatter), dict(args_parse=staticmethod(lambda *args: (args, {}))))
+    B = FormatGroup('B', formatter_type = blank_type, a = spec)
+    values = np.array([0, 3, -4])
+    assert B.format_columns(values).tolist() == [B.format(value) for value in values]
+    
+@pytest.mark.parametrize('spec', ['{:^7d}', '{:*^8d}', '{:^9.2f}', '{:^6s}', '{:-^5s}'])
+def test_format_columns_centered(spec):
+    C = FormatGroup('C', a = spec)
+    values = np.array(['a', 'bc', 'def', '']) if spec.endswith('s}') else np.array([-123, 4, 56, 7890])
+    assert C.format_columns(values).tolist() == [C.format(value) for value in values.tolist()]
+    
+@pytest.mark.parametrize('spec', ['{:>05d}', '{:<05d}', '{:^07.1f}', '{:*>05d}', '{:>05s}'])
+def test_format_columns_zero_aligned(spec):
+    Z = FormatGroup('Z', a = spec)
+    values = np.array(['a', 'bc']) if spec.endswith('s}') else np.array([5, -12, 340])
+    assert Z.format_columns(values).tolist() == [Z.format(value) for value in values.tolist()]
+    
+def test_format_columns_fallback():
+    S = FormatGroup('S', a = '{:,d}', b = '{:>4s}')
+    assert S.format_columns(np.array([1000, 2]), np.array(['a', 'bc'])).tolist() == ['1,000   a', '2  bc']